@@ -0,0 +1,61 @@
+#This benchmark measures how much memory one value on the data stack takes
+#It generates IPPcode23 program which pushes N different integers on the stack,
+#runs the interpret with it for two sizes of N and compares peak memory of both runs
+#Usage: python3 value_memory.py [path to interpret.py ...]
+#More interprets can be given, for example the current one and an older one from git, to compare them
+import os
+import subprocess
+import sys
+import tempfile
+
+SMALL = 10000
+LARGE = 1000000
+
+DEFAULT_INTERPRET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interpret.py')
+
+#This function returns XML of program, which pushes integers 0..count-1 on the stack
+def make_program(count):
+    instructions = [
+        ('DEFVAR', [('var', 'GF@i')]),
+        ('MOVE', [('var', 'GF@i'), ('int', '0')]),
+        ('LABEL', [('label', 'loop')]),
+        ('PUSHS', [('var', 'GF@i')]),
+        ('ADD', [('var', 'GF@i'), ('var', 'GF@i'), ('int', '1')]),
+        ('JUMPIFNEQ', [('label', 'loop'), ('var', 'GF@i'), ('int', str(count))]),
+    ]
+    lines = [ '<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode23">' ]
+    for order, (opcode, args) in enumerate(instructions, 1):
+        lines.append(f'<instruction order="{order}" opcode="{opcode}">')
+        for num, (type, text) in enumerate(args, 1):
+            lines.append(f'<arg{num} type="{type}">{text}</arg{num}>')
+        lines.append('</instruction>')
+    lines.append('</program>')
+    return "\n".join(lines)
+
+#This function runs the interpret and returns its peak resident memory in bytes
+def peak_memory(interpret, source):
+    process = subprocess.Popen([ sys.executable, interpret, '--source', source, '--input', os.devnull ],
+                               stdout = subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    if os.waitstatus_to_exitcode(status) != 0:
+        sys.exit(f'{interpret} failed with exit code {os.waitstatus_to_exitcode(status)}')
+    #ru_maxrss is in kilobytes on Linux
+    return usage.ru_maxrss * 1024
+
+def main():
+    interprets = sys.argv[1:] or [ DEFAULT_INTERPRET ]
+    with tempfile.TemporaryDirectory() as directory:
+        sources = {}
+        for count in (SMALL, LARGE):
+            sources[count] = os.path.join(directory, f'stack{count}.xml')
+            with open(sources[count], 'w') as file:
+                file.write(make_program(count))
+
+        for interpret in interprets:
+            small = peak_memory(interpret, sources[SMALL])
+            large = peak_memory(interpret, sources[LARGE])
+            per_value = (large - small) / (LARGE - SMALL)
+            print(f'{interpret}: peak {large / 2**20:.1f} MiB for {LARGE} values, {per_value:.1f} B per value on the stack')
+
+if __name__ == '__main__':
+    main()
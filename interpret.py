@@ -1,8 +1,92 @@
 import xml.etree.ElementTree as ET
 import sys
-from collections import OrderedDict
-from enum import Enum
+from collections import namedtuple, OrderedDict
 import argparse
+import mmap
+import os
+import hashlib
+import marshal
+import gc
+import io
+import time
+import json
+import operator
+import socketserver
+import stat
+import threading
+import asyncio
+import multiprocessing
+import concurrent.futures
+
+#Version of the interpret. It is a part of the key of cached compiled programs,
+#so it must be changed every time the format of compiled program changes
+INTERPRETER_VERSION = '1.0'
+
+#Exceptions of the interpret. Every error carries the return code the interpret ends with
+#and the order of the instruction where it was found, if it is known
+class InterpretError(Exception):
+    code = 99
+
+    def __init__(self, message = None, order = None):
+        super().__init__(message)
+        self.order = order
+
+    def __str__(self):
+        message = super().__str__()
+        if self.order != None:
+            return f'{message} (instruction {self.order})'
+        return message
+
+class ParameterError(InterpretError):
+    code = 10
+
+class InputFileError(InterpretError):
+    code = 11
+
+class OutputFileError(InterpretError):
+    code = 12
+
+class XMLFormatError(InterpretError):
+    code = 31
+
+class XMLStructureError(InterpretError):
+    code = 32
+
+class SemanticError(InterpretError):
+    code = 52
+
+class OperandTypeError(InterpretError):
+    code = 53
+
+class UndefinedVariableError(InterpretError):
+    code = 54
+
+class FrameError(InterpretError):
+    code = 55
+
+class MissingValueError(InterpretError):
+    code = 56
+
+class OperandValueError(InterpretError):
+    code = 57
+
+class StringError(InterpretError):
+    code = 58
+
+#This error is raised when the program exceeds one of the limits given to the interpret
+#stats describe the state of the interpret at the moment the limit was exceeded
+class LimitError(InterpretError):
+    code = 60
+
+    def __init__(self, message = None, order = None, stats = None):
+        super().__init__(message, order)
+        self.stats = stats
+
+#This exception is raised by EXIT instruction to stop the interpretation, it is not an error
+class ProgramExit(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
 
 #This list includes all opcodes
 opcodes = [ 'MOVE', 'CREATEFRAME', 'PUSHFRAME', 'POPFRAME', 'DEFVAR', 'CALL', 'RETURN',
@@ -10,750 +94,1733 @@ opcodes = [ 'MOVE', 'CREATEFRAME', 'PUSHFRAME', 'POPFRAME', 'DEFVAR', 'CALL', 'R
             'INT2CHAR', 'STRI2INT', 'READ', 'WRITE', 'CONCAT', 'STRLEN', 'GETCHAR', 'SETCHAR', 'TYPE',
             'LABEL', 'JUMP', 'JUMPIFEQ', 'JUMPIFNEQ', 'EXIT', 'DPRINT', 'BREAK' ]   
 
+#This dictionary maps every opcode to its id, which is the index of the opcode in the list above
+opcode_ids = { opcode: id for id, opcode in enumerate(opcodes) }
+
+#Attributes allowed in the 'program' element
+program_attribs = frozenset(('name', 'description', 'language'))
+
+#This dictionary says which kinds of arguments every instruction takes
+#'var' is a variable, 'symb' is a variable or a literal, 'label' is a label name and 'type' is a type name
+opcode_args = {
+    'MOVE': ('var', 'symb'), 'CREATEFRAME': (), 'PUSHFRAME': (), 'POPFRAME': (), 'DEFVAR': ('var',),
+    'CALL': ('label',), 'RETURN': (), 'PUSHS': ('symb',), 'POPS': ('var',),
+    'ADD': ('var', 'symb', 'symb'), 'SUB': ('var', 'symb', 'symb'), 'MUL': ('var', 'symb', 'symb'),
+    'IDIV': ('var', 'symb', 'symb'), 'LT': ('var', 'symb', 'symb'), 'GT': ('var', 'symb', 'symb'),
+    'EQ': ('var', 'symb', 'symb'), 'AND': ('var', 'symb', 'symb'), 'OR': ('var', 'symb', 'symb'),
+    'NOT': ('var', 'symb'), 'INT2CHAR': ('var', 'symb'), 'STRI2INT': ('var', 'symb', 'symb'),
+    'READ': ('var', 'type'), 'WRITE': ('symb',), 'CONCAT': ('var', 'symb', 'symb'), 'STRLEN': ('var', 'symb'),
+    'GETCHAR': ('var', 'symb', 'symb'), 'SETCHAR': ('var', 'symb', 'symb'), 'TYPE': ('var', 'symb'),
+    'LABEL': ('label',), 'JUMP': ('label',), 'JUMPIFEQ': ('label', 'symb', 'symb'),
+    'JUMPIFNEQ': ('label', 'symb', 'symb'), 'EXIT': ('symb',), 'DPRINT': ('symb',), 'BREAK': () }
+
+#Superinstructions the program makes from common sequences of instructions, they can not be written in XML
+#Their ids follow ids of opcodes above, handler_ids maps both kinds to the index of their handler
+fused_opcodes = [ 'COMPARE_JUMP', 'DEFVAR_MOVE', 'CALL_FRAME' ]
+
+#Variants of instructions used where the analysis of the program proves that all their checks would pass
+#Their arguments are slots of the global frame, literals get their own slots after the variables
+special_opcodes = [ 'MOVE_GF', 'ADD_GF', 'SUB_GF', 'MUL_GF', 'LT_GF', 'GT_GF', 'EQ_GF', 'AND_GF', 'OR_GF', 'NOT_GF',
+                    'CONCAT_GF', 'STRLEN_GF', 'COMPARE_JUMP_GF' ]
+
+#Quickened variants of instructions for integer and string operands. When the normal handler processes its instruction
+#for the first time in a run, it rewrites it in the code of the run to the quickened one for the types of the operands.
+#Arguments of quickened instructions are pairs of frame code and slot followed by the original instruction. The quickened
+#handler checks only that the frames, variables and types are there, if anything else is found, it rewrites the instruction
+#back and lets the normal handler process it
+quick_opcodes = [ 'ADD_INT', 'SUB_INT', 'MUL_INT', 'LT_INT', 'GT_INT', 'EQ_INT', 'JUMPIFEQ_INT', 'JUMPIFNEQ_INT', 'COMPARE_JUMP_INT',
+                  'LT_STR', 'GT_STR', 'EQ_STR', 'JUMPIFEQ_STR', 'JUMPIFNEQ_STR', 'COMPARE_JUMP_STR' ]
+handler_ids = { opcode: id for id, opcode in enumerate(opcodes + fused_opcodes + special_opcodes + quick_opcodes) }
+
+#This function returns the number of instructions of the program which the instruction of the fused code stands for
+def get_length(instr):
+    if instr.opcode == handler_ids['CALL_FRAME']:
+        return 2 * len(instr.args[1]) + 3
+    if instr.opcode in (handler_ids['COMPARE_JUMP'], handler_ids['DEFVAR_MOVE'], handler_ids['COMPARE_JUMP_GF']):
+        return 2
+    return 1
+
+#Codes of frames used in decoded variables
+GF = 0
+LF = 1
+TF = 2
+frame_codes = { 'GF': GF, 'LF': LF, 'TF': TF }
+#Code of the frame of literals, quickened instructions read literals from it the same way as variables from other frames
+CF = 3
+
+#Decoded argument of type var. Frame code and the name of the variable are split only once, when the program is loaded
+#The name is resolved to the slot of the variable: global variables have their own slots in the global frame
+#and all names used with LF and TF share one layout of slots, because temporary frame becomes local after PUSHFRAME
+Var = namedtuple('Var', ['frame', 'slot', 'name'])
+
+#Decoded instruction. It is the only form of instruction the interpret works with,
+#so the XML tree is not touched after the program is loaded
+#order is the order from XML, opcode is the id of the opcode and args is a tuple of decoded arguments:
+#Var for variables, Value for literals, plain strings for labels and types
+#and indexes of target instructions for labels of CALL and jump instructions
+Instruction = namedtuple('Instruction', ['order', 'opcode', 'args'])
+
 #This class provides comfortable interface for getting information about program's instructions and their arguments
-#It also contains checker of XML validity
+#It also contains checker of XML validity and compiles the XML tree into the list of decoded instructions
 class Program:
-    def __init__(self, source):
+    #source is a path to XML file, XML as bytes or a binary file object
+    #If cache_dir is given and the source is a path or bytes, the compiled program is stored in that directory
+    #and loaded from it next time instead of reading the XML again
+    def __init__(self, source, cache_dir = None):
+        self.constants = {}
+        self.global_names = []
+        self.global_slots = {}
+        self.local_names = []
+        self.local_slots = {}
+        self.global_constants = []
+        self.global_constant_slots = {}
+        #Hash of the source, it is known only if the program was compiled with the cache
+        self.digest = None
+        #Translation of the program to Python, if it is made by translate, the interpret runs it instead of instructions
+        self.translation = None
+        #Loading makes millions of small objects which never form cycles, garbage collector would only waste time on them
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if cache_dir != None and isinstance(source, (str, bytes)):
+                self.compile_cached(source, cache_dir)
+            else:
+                self.compile(source)
+            self.fuse()
+            self.specialize()
+            self.constant_values = list(self.constants.values())
+            self.constant_slots = { id(value): slot for slot, value in enumerate(self.constant_values) }
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    #This function translates the program to Python, the translation is used by every Interpret made for the program later
+    #If the program was loaded with the cache, compiled translation is stored in it as well
+    def translate(self):
+        self.translation = Translation(self)
+        if self.digest == None:
+            self.translation.compile()
+            return
+        path = os.path.join(self.cache_dir, self.digest + '.ippy')
+        if not self.translation.read_cache(path, self.digest):
+            self.translation.compile()
+            self.translation.write_cache(path, self.digest)
+
+    #This function compiles the program from XML, source is a path, a binary file object or the XML itself as bytes
+    def compile(self, source):
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        try:
+            instructions = self.load(source)
+        except ET.ParseError as error:
+            raise XMLFormatError(f'XML is not well-formed: {error}')
+        except OSError as error:
+            raise InputFileError(f'can not read source: {error}')
+        self.make_instructions_list(instructions)
+
+    #This function compiles the program, or loads it from the cache if it was already compiled
+    #The cached program is found by the hash of the source and the version of the interpret
+    #The source is a path or the XML itself, a file is read only once, so the hash describes the same bytes which are compiled
+    def compile_cached(self, source, cache_dir):
+        if isinstance(source, str):
+            source = read_source(source)
+        digest = hashlib.sha256(INTERPRETER_VERSION.encode() + b'\0' + source).hexdigest()
+        self.digest = digest
+        self.cache_dir = cache_dir
+        path = os.path.join(cache_dir, digest + '.ippc')
+        if self.read_cache(path, digest):
+            return
+        self.compile(io.BytesIO(source))
+        self.write_cache(path, digest)
+
+    #This function loads the compiled program from the cache file, it returns False if there is no valid one
+    def read_cache(self, path, digest):
+        try:
+            with open(path, 'rb') as file:
+                version, cached_digest, data = marshal.loads(file.read())
+            if version != INTERPRETER_VERSION or cached_digest != digest:
+                return False
+            self.from_data(data)
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        return True
+
+    #This function stores the compiled program to the cache file
+    #The file is written under a temporary name first, so other processes never read a half written file
+    #The cache is only an optimization, so errors while writing it are ignored
+    def write_cache(self, path, digest):
+        temp_path = f'{path}.{os.getpid()}.tmp'
         try:
-            self.prog = ET.parse(source)
-        except ET.ParseError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'wb') as file:
+                marshal.dump((INTERPRETER_VERSION, digest, self.to_data()), file)
+            os.replace(temp_path, path)
+        except OSError:
             try:
-                self.prog = ET.fromstring(sys.stdin.read())
-            except:
-                sys.exit(31)
-        self.prog = self.prog.getroot()
-        if not self.check_xml():
-            sys.exit(32)
-        self.make_instructions_list()
-
-    #This function includes XML semantic checks
-    def check_xml(self):
-        if self.prog.tag != 'program':
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    #This function converts the compiled program into the tuple of basic Python values, which can be stored by marshal
+    #Arguments are stored as tuples: ('var', frame, slot, name) for variables, ('const', index) for literals
+    #which point to the list of constants, and labels, types and jump targets as they are
+    def to_data(self):
+        constants = []
+        constant_ids = {}
+        for key, value in self.constants.items():
+            constant_ids[id(value)] = len(constants)
+            constants.append((key, value.type, value.value))
+        code = []
+        for instr in self.code:
+            args = []
+            for arg in instr.args:
+                if type(arg) is Var:
+                    args.append(('var', arg.frame, arg.slot, arg.name))
+                elif type(arg) is Value:
+                    args.append(('const', constant_ids[id(arg)]))
+                else:
+                    args.append(arg)
+            code.append((instr.order, instr.opcode, tuple(args)))
+        return (constants, tuple(code), self.orders, self.labels, self.global_names, self.local_names)
+
+    #This function restores the compiled program from the data made by to_data
+    def from_data(self, data):
+        constants, code, self.orders, self.labels, self.global_names, self.local_names = data
+        values = []
+        for key, value_type, value in constants:
+            if value_type == NIL:
+                values.append(NIL_VALUE)
+            elif value_type == BOOL:
+                values.append(TRUE_VALUE if value else FALSE_VALUE)
+            else:
+                values.append(Value(value_type, value))
+            self.constants[key] = values[-1]
+        self.global_slots = { name: slot for slot, name in enumerate(self.global_names) }
+        self.local_slots = { name: slot for slot, name in enumerate(self.local_names) }
+        self.code = []
+        for order, opcode, args in code:
+            decoded = []
+            for arg in args:
+                if type(arg) is tuple and arg[0] == 'var':
+                    decoded.append(Var(arg[1], arg[2], arg[3]))
+                elif type(arg) is tuple:
+                    decoded.append(values[arg[1]])
+                else:
+                    decoded.append(arg)
+            self.code.append(Instruction(order, opcode, tuple(decoded)))
+
+    #This function reads the XML as a stream and compiles every instruction as soon as the whole element is read
+    #The element is thrown away after that, so the XML tree is never held in memory
+    #It returns the dictionary of compiled instructions by their orders
+    #When the XML is not a correct program, the rest of XML is still read before XMLStructureError is raised,
+    #because not well-formed XML must be reported before wrong structure
+    def load(self, source):
+        instructions = {}
+        orders = set()
+        error = None
+        root = None
+        depth = 0
+        for event, elem in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if depth == 1:
+                    root = elem
+                    if not self.check_program(root):
+                        error = XMLStructureError('wrong program element')
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            if error == None:
+                try:
+                    order = self.check_instruction(elem, orders)
+                    if order == None:
+                        raise XMLStructureError(f'wrong instruction element {elem.tag} {elem.attrib}')
+                    instructions[order] = self.compile_instruction(elem, order)
+                except XMLStructureError as exception:
+                    error = exception
+            root.remove(elem)
+        if error != None:
+            raise error
+        return instructions
+
+    #This function checks 'program' tag and it's attributes
+    def check_program(self, prog):
+        if prog.tag != 'program':
             return False
 
-        #Checking 'program' tag and it's attributes
-        prog_tag_attribs = self.prog.attrib
-        for attrib in prog_tag_attribs:
-            if attrib != 'name' and attrib != 'description' and attrib != 'language':
+        for attrib, value in prog.attrib.items():
+            if attrib not in program_attribs:
                 return False
-            if attrib == 'language' and self.prog.get(attrib) != 'IPPcode23':
-                return False
-        
-        #Checking instructions and their orders
-        orders = []
-        instructions = self.prog.findall('*')
-        for instr in instructions:
-            if instr.tag != 'instruction':
-                return False
-            instr_attribs = instr.attrib
-            is_opcode = False
-            is_order = False
-            for attrib in instr_attribs:
-                value = instr.get(attrib)
-                if attrib == 'order':
-                    is_order = True
-                    if int(value) < 0 or value in orders:
-                        return False
-                    orders.append(value)
-                elif attrib == 'opcode':
-                    is_opcode = True
-                    if value.upper() not in opcodes:
-                        return False
-                else:
-                    return False
-            if not is_opcode or not is_order:
+            if attrib == 'language' and value != 'IPPcode23':
                 return False
-            
-        #Now we can be sure we have XML code that describes a IPPcode23 code
-        #and all instructions have all necessary attributes with correct values
-        #It is necessary to add that we do not contol the count and semantic of instructions' arguments.
-        #We suppose, that if the opcode and order are correct, the whole instruction is correct,
-        #because it is a type of error that must be eliminated in parse.php
         return True
 
-    #This fumction reads all instructions form an XML tree and creates a dictionary from them.
-    #It also creates the list of orders which can be used for easy moving on dictionary
-    #It also creates a dictionary for labels
-    def make_instructions_list(self):
-        self.orders = []
-        self.instructions = {}
+    #This function checks the instruction element, it's order and opcode and returns the order as a number
+    #orders is the set of orders of instructions which were already checked, the new order is added to it
+    #None is returned if the instruction is not correct
+    def check_instruction(self, instr, orders):
+        if instr.tag != 'instruction' or len(instr.attrib) != 2:
+            return None
+        opcode = instr.get('opcode')
+        order = instr.get('order')
+        if opcode == None or order == None or opcode.upper() not in opcode_ids:
+            return None
+        try:
+            order = int(order)
+        except ValueError:
+            return None
+        if order < 0 or order in orders:
+            return None
+        orders.add(order)
+
+        #Now we can be sure the element describes an IPPcode23 instruction with all necessary attributes with correct values
+        #Its arguments are checked when the instruction is compiled
+        return order
+
+    #This fumction makes the list of decoded instructions sorted by their orders.
+    #It also creates the list of orders which can be used for easy moving on that list
+    #It also creates a dictionary for labels, which maps every label to the index of its instruction in the list
+    def make_instructions_list(self, instructions):
+        self.orders = sorted(instructions.keys())
+        self.code = [ instructions[order] for order in self.orders ]
+
         self.labels = {}
-        instructions = self.prog.findall('*')
-        for instr in instructions:
-            order = int(instr.get('order'))
-            opcode = instr.get('opcode')
-            self.instructions[order] = instr
-            if opcode.upper() == 'LABEL':
-                label = " ".join(instr.find('arg1').text.strip().split())
+        for index, instr in enumerate(self.code):
+            if instr.opcode == opcode_ids['LABEL']:
+                label = instr.args[0]
                 if label in self.labels:
-                    sys.exit(52)
-                self.labels[label] = order
-        self.orders = sorted(self.instructions.keys())
-        self.instructions = OrderedDict(sorted(self.instructions.items()))
-    
-    #This functions returns the opcode of an instruction with defined order
-    def get_instruction(self, order):
-        inst = self.instructions[order]
-        opcode = inst.attrib['opcode']
-        return opcode
-
-    #This help function returns the defined XML element of argument of inctruction with defined order 
-    def get_argument(self, order, attrib_num):
-        instr = self.instructions[order]
-        argStr = 'arg' + str(attrib_num)
-        arg = instr.find(argStr)
-        return arg
-    
-    #This function returns the type of defined argument of instruction with defined order
-    def get_argument_type(self, order, attrib_num):
-        arg = self.get_argument(order, attrib_num)
-        type = arg.attrib['type']
-        return type
-
-    #This function returns the value of defined argument of instruction with defined order
-    def get_argument_value(self, order, attrib_num):
-        arg = self.get_argument(order, attrib_num)
-        value = " ".join(arg.text.strip().split())
+                    raise SemanticError(f'label {label} is defined more than once', instr.order)
+                self.labels[label] = index
+        self.resolve_labels()
+
+    #This function replaces label names in jump instructions with indexes of instructions they jump to,
+    #so the interpret does not need to look for the label on every jump
+    def resolve_labels(self):
+        jumps = { opcode_ids['CALL'], opcode_ids['JUMP'], opcode_ids['JUMPIFEQ'], opcode_ids['JUMPIFNEQ'] }
+        for index, instr in enumerate(self.code):
+            if instr.opcode in jumps:
+                label = instr.args[0]
+                if label not in self.labels:
+                    raise SemanticError(f'label {label} is not defined', instr.order)
+                self.code[index] = instr._replace(args = (self.labels[label],) + instr.args[1:])
+
+    #This function makes fused_code, the copy of code where common sequences of instructions are replaced by superinstructions
+    #The superinstruction is placed at the index of the first instruction of the sequence and the rest of it stays after it,
+    #so indexes of instructions do not change. No jump nor return can lead inside a sequence: they lead only to labels
+    #and to instructions after CALL, and none of them can be in the middle of a fused sequence
+    def fuse(self):
+        self.fused_code = list(self.code)
+        index = 0
+        while index < len(self.code):
+            fused = self.fuse_call(index) or self.fuse_compare_jump(index) or self.fuse_defvar_move(index)
+            if fused == None:
+                index += 1
+                continue
+            self.fused_code[index], length = fused
+            index += length
+
+    #CREATEFRAME, any number of pairs DEFVAR TF@x and MOVE TF@x <symb>, PUSHFRAME and CALL
+    def fuse_call(self, index):
+        code = self.code
+        if code[index].opcode != opcode_ids['CREATEFRAME']:
+            return None
+        pairs = []
+        next = index + 1
+        while (next + 1 < len(code) and code[next].opcode == opcode_ids['DEFVAR'] and code[next].args[0].frame == TF
+               and code[next + 1].opcode == opcode_ids['MOVE'] and code[next + 1].args[0] == code[next].args[0]):
+            pairs.append((code[next], code[next + 1]))
+            next += 2
+        if next + 1 >= len(code) or code[next].opcode != opcode_ids['PUSHFRAME'] or code[next + 1].opcode != opcode_ids['CALL']:
+            return None
+        return Instruction(code[index].order, handler_ids['CALL_FRAME'], (code[next + 1].args[0], tuple(pairs), code[next + 1])), next + 2 - index
+
+    #LT, GT or EQ followed by JUMPIFEQ or JUMPIFNEQ which compares the result with a bool literal
+    def fuse_compare_jump(self, index):
+        code = self.code
+        if index + 1 >= len(code):
+            return None
+        compare, jump = code[index], code[index + 1]
+        if opcodes[compare.opcode] not in ('LT', 'GT', 'EQ') or opcodes[jump.opcode] not in ('JUMPIFEQ', 'JUMPIFNEQ'):
+            return None
+        var = compare.args[0]
+        if jump.args[1] == var and type(jump.args[2]) is Value and jump.args[2].type == BOOL:
+            literal = jump.args[2]
+        elif jump.args[2] == var and type(jump.args[1]) is Value and jump.args[1].type == BOOL:
+            literal = jump.args[1]
+        else:
+            return None
+        jump_if = literal.value if jump.opcode == opcode_ids['JUMPIFEQ'] else not literal.value
+        args = (var, compare.args[1], compare.args[2], opcodes[compare.opcode], jump.args[0], jump_if)
+        return Instruction(compare.order, handler_ids['COMPARE_JUMP'], args), 2
+
+    #DEFVAR followed by MOVE to the same variable
+    def fuse_defvar_move(self, index):
+        code = self.code
+        if index + 1 >= len(code):
+            return None
+        defvar, move = code[index], code[index + 1]
+        if defvar.opcode != opcode_ids['DEFVAR'] or move.opcode != opcode_ids['MOVE'] or move.args[0] != defvar.args[0]:
+            return None
+        return Instruction(defvar.order, handler_ids['DEFVAR_MOVE'], (defvar.args[0], move)), 2
+
+    #This function replaces instructions of fused_code by their variants without checks where the analysis proves
+    #that the checks can not fail. It is done only for instructions which work with global variables and literals
+    #Programs without loops and calls process every instruction at most once, so the analysis would not pay off
+    def specialize(self):
+        if len(self.code) * max(1, len(self.global_names)) > ANALYSIS_LIMIT:
+            return
+        if not any(instr.opcode == opcode_ids['CALL'] or (instr.opcode in jump_ids and instr.args[0] <= index)
+                   for index, instr in enumerate(self.code)):
+            return
+        analysis = Analysis(self)
+        analysis.run()
+        for index, state in analysis.get_states():
+            instr = self.fused_code[index]
+            if instr is self.code[index] or instr.opcode == handler_ids['COMPARE_JUMP']:
+                special = self.specialize_instruction(instr, state)
+                if special != None:
+                    self.fused_code[index] = special
+
+    #This function returns the variant of the instruction without checks, or None if some check may fail
+    def specialize_instruction(self, instr, state):
+        name = (opcodes + fused_opcodes)[instr.opcode]
+        if name + '_GF' not in handler_ids:
+            return None
+        result = instr.args[0]
+        if result.frame != GF or state[result.slot] & MAY_UNDEFINED:
+            return None
+        operands = instr.args[1:3] if name != 'NOT' and name != 'STRLEN' and name != 'MOVE' else instr.args[1:2]
+        masks = [ Analysis.get_mask(operand, state) for operand in operands ]
+        if None in masks:
+            return None
+        if name == 'MOVE':
+            if masks[0] == 0 or masks[0] & (MAY_UNDEFINED | MAY_UNINITIALIZED):
+                return None
+        elif name in ('LT', 'GT', 'EQ', 'COMPARE_JUMP'):
+            compare = instr.args[3] if name == 'COMPARE_JUMP' else name
+            if masks[0] != masks[1] or masks[0] not in type_masks.values() or (compare != 'EQ' and masks[0] == type_masks[NIL]):
+                return None
+        elif any(mask != type_masks[operand_types[name]] for mask in masks):
+            return None
+        slots = [ operand.slot if type(operand) is Var else self.get_constant_slot(operand) for operand in operands ]
+        return Instruction(instr.order, handler_ids[name + '_GF'], (result.slot, *slots) + instr.args[3:])
+
+    #This function returns the slot of the global frame which holds the literal for specialized instructions
+    def get_constant_slot(self, value):
+        if id(value) not in self.global_constant_slots:
+            self.global_constant_slots[id(value)] = len(self.global_names) + len(self.global_constants)
+            self.global_constants.append(value)
+        return self.global_constant_slots[id(value)]
+
+    #This function turns one XML element of instruction into decoded instruction
+    def compile_instruction(self, instr, order):
+        opcode = instr.get('opcode').upper()
+        args = []
+        for num, kind in enumerate(opcode_args[opcode], 1):
+            arg = instr.find('arg' + str(num))
+            if arg is None or 'type' not in arg.attrib:
+                raise XMLStructureError(f'missing argument {num} of {opcode}', order)
+            try:
+                args.append(self.compile_argument(kind, arg.attrib['type'], " ".join((arg.text or '').split())))
+            except XMLStructureError as error:
+                error.order = order
+                raise
+        return Instruction(order, opcode_ids[opcode], tuple(args))
+
+    #This function decodes one argument of an instruction
+    def compile_argument(self, kind, type, text):
+        if type == 'var':
+            if kind != 'var' and kind != 'symb':
+                raise XMLStructureError(f'variable {text} used as {kind}')
+            frame, sep, name = text.partition('@')
+            frame = frame.upper()
+            if not sep or frame not in frame_codes:
+                raise XMLStructureError(f'wrong variable {text}')
+            return self.resolve_var(frame_codes[frame], name)
+        if kind == 'label' or kind == 'type':
+            if type != kind:
+                raise XMLStructureError(f'{type} used as {kind}')
+            return text
+        if kind != 'symb':
+            raise XMLStructureError(f'{type} used as {kind}')
+        return self.get_constant(type, text)
+
+    #This function returns the decoded variable with the slot assigned to its name
+    def resolve_var(self, frame, name):
+        if frame == GF:
+            names, slots = self.global_names, self.global_slots
+        else:
+            names, slots = self.local_names, self.local_slots
+        if name not in slots:
+            slots[name] = len(names)
+            names.append(name)
+        return Var(frame, slots[name], name)
+
+    #This function returns the value of a literal from the constant pool
+    #Every distinct literal is decoded only once and all instructions using it share the same Value,
+    #so the values in the pool must never be changed
+    def get_constant(self, type, text):
+        key = (type, text)
+        value = self.constants.get(key)
+        if value is None:
+            value = self.get_value_from_literal(type, text)
+            self.constants[key] = value
         return value
 
-#This class makes work with variables values much easier.
-#It stores type and value and provides methods to change it
-class Value:
-    class Types(Enum):
-        INT = 1
-        STRING = 2
-        BOOL = 3
-        NIL = 4
+    #This function parses the string and convert it into Python format
+    def parse_string(self, string):
+        decoded_chars = []
+        i = 0
+        while i < len(string):
+            c = string[i]
+            if c == "\\":
+                decoded_chars.append(chr(int(string[i+1:i+4])))
+                i += 4
+            else:
+                decoded_chars.append(c)
+                i += 1
+        return "".join(decoded_chars)
+
+    #This function analyse the literal type and convert it into Python value
+    def get_value_from_literal(self, type, arg):
+        try:
+            if type == 'int':
+                return Value(INT, int(arg))
+            elif type == 'bool':
+                if arg == 'true':
+                    return TRUE_VALUE
+                return FALSE_VALUE
+            elif type == 'nil':
+                return NIL_VALUE
+            elif type == 'string':
+                return Value(STRING, self.parse_string(arg))
+        except ValueError:
+            pass
+        raise XMLStructureError(f'wrong literal {type}@{arg}')
 
-    def __init__(self):
-        self.type = None
-        self.value = None
+#Type tags of values. Small integers are compared much faster than members of Enum
+INT = 1
+STRING = 2
+BOOL = 3
+NIL = 4
 
-    def set_value(self, new_type, new_value):
-        self.type = new_type
-        self.value = new_value
+#Names of types as they are written by TYPE and BREAK
+type_names = { INT: 'int', STRING: 'string', BOOL: 'bool', NIL: 'nil' }
 
-    def get_type(self):
-        return self.type
+#Suffixes of quickened variants of instructions by the type of both operands
+quick_suffixes = { INT: '_INT', STRING: '_STR' }
 
-    def get_value(self):
-        return self.value
+#States of instructions in the code of a run: not processed yet, rewritten to a quickened variant, never to be quickened
+QUICK_NEW = 0
+QUICK_DONE = 1
+QUICK_NEVER = 2
 
-#This class lets to group variable by frames and provides methods for adding new varibale and reading existing ones
+#This class makes work with variables values much easier.
+#It stores type tag and Python value. Values are never changed after they are made,
+#so one Value may be shared by many variables, stack items and constants without copying
+class Value:
+    __slots__ = ('type', 'value')
+
+    def __init__(self, type = None, value = None):
+        self.type = type
+        self.value = value
+
+#Shared values. Nil and bool values are always taken from here, they are never made again
+#Uninitialized value is the value of variable after DEFVAR, it has no type
+NIL_VALUE = Value(NIL, None)
+TRUE_VALUE = Value(BOOL, True)
+FALSE_VALUE = Value(BOOL, False)
+UNINITIALIZED = Value()
+
+#Results of TYPE instruction for every type tag, uninitialized variable has an empty string as its type
+type_values = { type: Value(STRING, name) for type, name in type_names.items() }
+type_values[None] = Value(STRING, '')
+
+#States of a global variable in the analysis are bit masks of everything the variable can be at some place of the program
+MAY_UNDEFINED = 1
+MAY_UNINITIALIZED = 2
+type_masks = { INT: 4, STRING: 8, BOOL: 16, NIL: 32 }
+ANY_TYPE = 4 | 8 | 16 | 32
+
+#Types of operands of instructions which have variants without checks, LT, GT, EQ and MOVE are checked separately
+operand_types = { 'ADD': INT, 'SUB': INT, 'MUL': INT, 'AND': BOOL, 'OR': BOOL, 'NOT': BOOL, 'CONCAT': STRING, 'STRLEN': STRING }
+
+#Types of results of instructions which write to a variable, MOVE, POPS and READ are handled separately
+result_types = { 'ADD': INT, 'SUB': INT, 'MUL': INT, 'IDIV': INT, 'STRLEN': INT, 'STRI2INT': INT,
+                 'LT': BOOL, 'GT': BOOL, 'EQ': BOOL, 'AND': BOOL, 'OR': BOOL, 'NOT': BOOL,
+                 'INT2CHAR': STRING, 'CONCAT': STRING, 'GETCHAR': STRING, 'SETCHAR': STRING, 'TYPE': STRING }
+
+#Ids of instructions which write to their first argument and of instructions after which a new block starts
+result_ids = frozenset(opcode_ids[opcode] for opcode, kinds in opcode_args.items() if kinds[:1] == ('var',))
+jump_ids = frozenset(opcode_ids[opcode] for opcode in ('JUMP', 'JUMPIFEQ', 'JUMPIFNEQ'))
+block_end_ids = frozenset(opcode_ids[opcode] for opcode in ('JUMP', 'JUMPIFEQ', 'JUMPIFNEQ', 'CALL', 'RETURN', 'EXIT'))
+
+#The analysis is not done if the number of instructions multiplied by the number of global variables is bigger, it would take too long
+ANALYSIS_LIMIT = 20000000
+
+#This class finds which states every global variable can have before every instruction
+#It goes through the control flow graph of basic blocks of the program until nothing changes, CALL leads to its label
+#and RETURN to the instructions after all CALL instructions. An instruction which fails ends the program,
+#so only successful instructions are followed. Variables of local and temporary frames are not analysed
+#States are kept only at the starts of blocks, states of other instructions are computed by going through the block again
+class Analysis:
+    def __init__(self, program):
+        self.program = program
+        self.code = program.code
+        self.return_sites = [ index + 1 for index, instr in enumerate(self.code) if instr.opcode == opcode_ids['CALL'] ]
+        self.blocks = self.find_blocks()
+        #Tuple of masks of all global variables at the start of every block, blocks which can not be reached have none
+        self.states = {}
+
+    #This function returns the dictionary which maps the first instruction of every block to the index after its last one
+    #Blocks start at labels, at the start of the program and after every instruction which does not continue to the next one
+    def find_blocks(self):
+        starts = { 0 }
+        for index, instr in enumerate(self.code):
+            if instr.opcode == opcode_ids['LABEL']:
+                starts.add(index)
+            elif instr.opcode in block_end_ids:
+                starts.add(index + 1)
+        starts = sorted(start for start in starts if start < len(self.code))
+        return dict(zip(starts, starts[1:] + [ len(self.code) ]))
+
+    def run(self):
+        if len(self.code) == 0:
+            return
+        self.states[0] = (MAY_UNDEFINED,) * len(self.program.global_names)
+        work = [ 0 ]
+        while work:
+            start = work.pop()
+            state = self.states[start]
+            for index in range(start, self.blocks[start]):
+                state = self.transfer(self.code[index], state)
+            for next in self.successors(self.blocks[start] - 1):
+                if next >= len(self.code):
+                    continue
+                old = self.states.get(next)
+                new = state if old == None else tuple(mask1 | mask2 for mask1, mask2 in zip(old, state))
+                if new != old:
+                    self.states[next] = new
+                    work.append(next)
+
+    #This function returns pairs of indexes of reachable instructions and states of global variables before them
+    def get_states(self):
+        for start, end in self.blocks.items():
+            state = self.states.get(start)
+            if state == None:
+                continue
+            for index in range(start, end):
+                yield index, state
+                state = self.transfer(self.code[index], state)
+
+    #This function returns indexes of instructions which can be processed after the instruction
+    def successors(self, index):
+        instr = self.code[index]
+        name = opcodes[instr.opcode]
+        if name == 'JUMP' or name == 'CALL':
+            return (instr.args[0],)
+        if name == 'JUMPIFEQ' or name == 'JUMPIFNEQ':
+            return (instr.args[0], index + 1)
+        if name == 'RETURN':
+            return self.return_sites
+        if name == 'EXIT':
+            return ()
+        return (index + 1,)
+
+    #This function returns the state of global variables after the instruction succeeds
+    def transfer(self, instr, state):
+        if instr.opcode not in result_ids or instr.args[0].frame != GF:
+            return state
+        name = opcodes[instr.opcode]
+        if name == 'DEFVAR':
+            mask = MAY_UNINITIALIZED
+        elif name == 'MOVE':
+            mask = Analysis.get_mask(instr.args[1], state)
+            mask = ANY_TYPE if mask == None else mask & ANY_TYPE
+        elif name == 'POPS' or name == 'READ':
+            mask = ANY_TYPE
+        else:
+            mask = type_masks[result_types[name]]
+        slot = instr.args[0].slot
+        return state[:slot] + (mask,) + state[slot + 1:]
+
+    #This function returns the mask of a literal or global variable, None for variables of other frames
+    @staticmethod
+    def get_mask(symb, state):
+        if type(symb) is not Var:
+            return type_masks[symb.type]
+        if symb.frame != GF:
+            return None
+        return state[symb.slot]
+
+#This class lets to group variable by frames
+#Variables are not looked up by their names, every variable has a slot which is known when the program is loaded
+#The global frame has the list of all its slots, slot with None means that the variable is not defined
+#Local and temporary frames have a dictionary of defined variables by their slots, so creating them does not depend
+#on the number of local names in the program. Reading of a variable which is not defined raises KeyError there
 class Frame:
-    def __init__(self):
-        self.vars = {}
-    
-    def add_var(self, name, value):
-        self.vars[name] = value
-    
-    def get_var_type(self, name):
-        return self.vars[name].get_type()
-    
-    def get_var_value(self, name):
-        return self.vars[name].get_value()
-    
-    def check_var(self, name):
-        if name not in self.vars:
-            return False
-        return True
+    __slots__ = ('names', 'vars')
+
+    def __init__(self, names, local = True):
+        self.names = names
+        self.vars = {} if local else [ None ] * len(names)
+
+    #This function returns pairs of names and values of all defined variables of the frame
+    def get_defined_vars(self):
+        if type(self.vars) is dict:
+            return [ (self.names[slot], value) for slot, value in sorted(self.vars.items()) ]
+        return [ (name, value) for name, value in zip(self.names, self.vars) if value is not None ]
+
+    #This function returns the number of initialized variables of the local or temporary frame
+    def count_initialized(self):
+        return len(self.vars) - operator.countOf(self.vars.values(), UNINITIALIZED)
             
+#Default size of output buffer in characters
+OUTPUT_BUFFER_SIZE = 65536
+
+#This class collects texts written by the program and writes them to the stream in big blocks,
+#so output heavy programs do not call write of the stream for every WRITE instruction
+#Buffer size 0 means that every text is written immediately
+class Output:
+    def __init__(self, stream, buffer_size = OUTPUT_BUFFER_SIZE):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.size = 0
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.size += len(text)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if len(self.buffer) != 0:
+            self.stream.write("".join(self.buffer))
+            self.buffer.clear()
+            self.size = 0
+        self.stream.flush()
+
+#Size of blocks in which inputs are read, in bytes
+INPUT_BLOCK_SIZE = 1048576
+
+#This class gives lines of inputs to READ instruction
+#The data are read from the stream in big blocks, or the whole file is mapped to memory, and lines are cut out of them only when they are needed
+class Input:
+    def __init__(self, stream, data = None, block_size = INPUT_BLOCK_SIZE):
+        self.stream = stream
+        self.block_size = block_size
+        self.data = data if data != None else b''
+        self.pos = 0
+        self.eof = data != None
+        #read1 returns the data which are already available, so interactive input is not blocked until the whole block is read
+        if stream != None:
+            self.read = getattr(stream, 'read1', stream.read)
+
+    #This function reads next block from the stream and appends it to the rest of unprocessed data
+    def fill(self):
+        self.append(self.read(self.block_size))
+
+    #This function appends the block to the rest of unprocessed data, empty block means the end of input
+    def append(self, block):
+        if len(block) == 0:
+            self.eof = True
+        self.data = self.data[self.pos:] + block
+        self.pos = 0
+
+    #This function returns the next line without the line end, or None when there are no more lines
+    def readline(self):
+        end = self.data.find(b'\n', self.pos)
+        while end == -1 and not self.eof:
+            self.fill()
+            end = self.data.find(b'\n', self.pos)
+        if end == -1:
+            if self.pos >= len(self.data):
+                return None
+            end = len(self.data)
+        line = self.data[self.pos:end]
+        self.pos = end + 1
+        return line.decode()
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self.stream != None:
+            self.stream.close()
+
+#This exception is raised by AsyncInput when READ needs a line which was not received yet
+#The instruction is not processed and the interpretation is paused until more input comes
+class InputPending(Exception):
+    pass
+
+#This class gives lines of input received from asyncio stream reader
+#Data can not be waited for inside of READ, so the interpretation is paused and the runner fills the input asynchronously
+class AsyncInput(Input):
+    def __init__(self, reader, block_size = INPUT_BLOCK_SIZE):
+        super().__init__(None, None, block_size)
+        self.reader = reader
+        self.pending = False
+
+    def fill(self):
+        self.pending = True
+        raise InputPending
+
+    async def fill_async(self):
+        self.append(await self.reader.read(self.block_size))
+        self.pending = False
+
+#This function reads the whole source file with XML
+def read_source(path):
+    try:
+        with open(path, 'rb') as file:
+            return file.read()
+    except OSError as error:
+        raise InputFileError(f'can not read source: {error}')
+
+#This function opens the file with inputs for interpretation
+#Regular files are mapped to memory, other files (pipes, devices) are read by blocks
+def open_input(path):
+    try:
+        file = open(path, "rb")
+    except OSError as error:
+        raise InputFileError(f'can not open input: {error}')
+    if os.path.isfile(path) and os.path.getsize(path) > 0:
+        try:
+            return Input(file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError):
+            pass
+    return Input(file)
+
+#This class writes the output to asyncio stream writer
+#Writing to the writer only stores the data in it, the runner waits until they are sent with drain after every part of program
+class AsyncOutput(Output):
+    def flush(self):
+        if len(self.buffer) != 0:
+            self.stream.write("".join(self.buffer).encode())
+            self.buffer.clear()
+            self.size = 0
+
+#Limits of one run of a program, None means the limit is not set
+#instructions is the number of processed instructions, time is the wall time in seconds,
+#call_depth is the size of the call stack, data_stack the size of the data stack and string_size the length of a string
+Limits = namedtuple('Limits', ['instructions', 'time', 'call_depth', 'data_stack', 'string_size'], defaults=(None,) * 5)
+NO_LIMITS = Limits()
+
+#The number of instructions and the wall time are checked only at jumps and calls, every loop and recursion must pass them,
+#so straight code between the checks is limited by the length of the program. The clock is read once per this number of instructions
+LIMIT_CHECK_INTERVAL = 10000
+
+#Value of limits which are not set in the checks of handlers, the number of instructions and the call depth never reach it
+UNLIMITED = sys.maxsize
+
+#This class collects the profile of a run: how many times every instruction was processed and how long it took
+#Counts and times are kept by the index of instruction, everything else is computed from them when the report is made,
+#calls of labels are the counts of CALL instructions grouped by their target
+class Profile:
+    def __init__(self, program):
+        self.program = program
+        self.counts = [0] * len(program.code)
+        self.times = [0.0] * len(program.code)
+
+    #This function returns the report as a dictionary, all lists are sorted from the hottest items
+    def report(self):
+        code = self.program.code
+        label_names = { index: label for label, index in self.program.labels.items() }
+        opcode_counts = {}
+        opcode_times = {}
+        calls = {}
+        instructions = []
+        for index, instr in enumerate(code):
+            count = self.counts[index]
+            if count == 0:
+                continue
+            opcode = opcodes[instr.opcode]
+            opcode_counts[opcode] = opcode_counts.get(opcode, 0) + count
+            opcode_times[opcode] = opcode_times.get(opcode, 0.0) + self.times[index]
+            if opcode == 'CALL':
+                label = label_names[instr.args[0]]
+                calls[label] = calls.get(label, 0) + count
+            instructions.append({ 'order': instr.order, 'opcode': opcode, 'count': count, 'time': self.times[index] })
+        return {
+            'instructions': sum(self.counts),
+            'time': sum(self.times),
+            'opcodes': sorted(({ 'opcode': opcode, 'count': count, 'time': opcode_times[opcode] } for opcode, count in opcode_counts.items()),
+                              key=lambda item: item['time'], reverse=True),
+            'orders': sorted(instructions, key=lambda item: item['time'], reverse=True),
+            'calls': sorted(({ 'label': label, 'count': count } for label, count in calls.items()),
+                            key=lambda item: item['count'], reverse=True),
+        }
+
+    #This function writes the report as text to path and as JSON to path.json
+    def write(self, path):
+        report = self.report()
+        total = report['time'] or 1
+        with open(path, 'w') as file:
+            file.write(f"instructions: {report['instructions']}\ntime: {report['time']:.6f} s\n")
+            file.write('\nOPCODES\n')
+            for item in report['opcodes']:
+                file.write(f"{item['opcode']:<12}{item['count']:>12}{item['time']:>14.6f} s{100 * item['time'] / total:>8.2f} %\n")
+            file.write('\nINSTRUCTIONS\n')
+            for item in report['orders']:
+                file.write(f"{item['order']:>8} {item['opcode']:<12}{item['count']:>12}{item['time']:>14.6f} s{100 * item['time'] / total:>8.2f} %\n")
+            file.write('\nCALLS\n')
+            for item in report['calls']:
+                file.write(f"{item['label']:<24}{item['count']:>12}\n")
+        with open(path + '.json', 'w') as file:
+            json.dump(report, file, indent=1)
+
+#Instructions which are not counted by statistics
+STATS_IGNORED = frozenset((opcode_ids['LABEL'], opcode_ids['DPRINT'], opcode_ids['BREAK']))
+#PUSHFRAME moves the temporary frame to local frames, other instructions which change frames throw it away
+PUSHFRAME_ID = opcode_ids['PUSHFRAME']
+
+#This class collects statistics of a run: counts of processed instructions by their index,
+#the number of initialized variables in all frames and the highest sizes of data stack, frame stack and call stack
+#Instructions are counted as the run processes them: superinstructions by the index of their first instruction,
+#blocks of translated programs by their ranges and traces by their passes, counts of single instructions are computed when they are read
+class Stats:
+    def __init__(self, program):
+        self.program = program
+        #Code counted by counts, superinstructions of the fused code count all instructions they stand for
+        self.code = program.fused_code
+        self.counts = [0] * len(program.code)
+        #Differences of counts for ranges of instructions, the range from start to end adds 1 at start and subtracts 1 at end
+        self.ranges = [0] * (len(program.code) + 1)
+        #Passes of traces by their targets: indexes of instructions of the pass, the number of whole passes
+        #and numbers of partial passes by the number of instructions they processed
+        self.traces = {}
+        self.max_vars = 0
+        self.max_stack = 0
+        self.max_frames = 0
+        self.max_calls = 0
+
+    #processed is the number of instructions the trace processed before it returned
+    def add_trace(self, target, indexes, processed):
+        trace = self.traces.get(target)
+        if trace == None:
+            trace = self.traces[target] = [ indexes, 0, [0] * len(indexes) ]
+        passes, rest = divmod(processed, len(indexes))
+        trace[1] += passes
+        trace[2][rest] += 1
+
+    def add_vars(self, count):
+        if count > self.max_vars:
+            self.max_vars = count
+
+    def add_depth(self, stack, frames, calls):
+        if stack > self.max_stack:
+            self.max_stack = stack
+        if frames > self.max_frames:
+            self.max_frames = frames
+        if calls > self.max_calls:
+            self.max_calls = calls
+
+    def add_range(self, start, end):
+        self.ranges[start] += 1
+        self.ranges[end] -= 1
+
+    #This function counts the instructions from index on which were processed by the superinstruction, block or trace
+    #stopped by an exception, processed is the number of all instructions processed by the run
+    def add_rest(self, index, processed):
+        rest = processed - sum(self.get_counts())
+        if rest > 0:
+            self.add_range(index, index + rest)
+
+    #This function returns counts of processed instructions by their index in the code of the program
+    def get_counts(self):
+        counts = list(self.counts)
+        for index, instr in enumerate(self.code):
+            for part in range(index + 1, index + get_length(instr)):
+                counts[part] += self.counts[index]
+        running = 0
+        for index in range(len(counts)):
+            running += self.ranges[index]
+            counts[index] += running
+        for indexes, passes, rests in self.traces.values():
+            running = 0
+            for position in range(len(indexes) - 1, -1, -1):
+                counts[indexes[position]] += passes + running
+                running += rests[position]
+        return counts
+
+    #This function returns the number of processed instructions, LABEL, DPRINT and BREAK are not counted
+    def get_insts(self):
+        code = self.program.code
+        return sum(count for index, count in enumerate(self.get_counts()) if code[index].opcode not in STATS_IGNORED)
+
+    #This function returns the order of the most often processed instruction, the lowest order if there are more of them
+    def get_hot(self):
+        code = self.program.code
+        counts = self.get_counts()
+        hot = None
+        for index, count in enumerate(counts):
+            if count == 0 or code[index].opcode in STATS_IGNORED:
+                continue
+            if hot == None or count > counts[hot] or (count == counts[hot] and code[index].order < code[hot].order):
+                hot = index
+        return code[hot].order if hot != None else ''
+
+    #This function returns the value of one statistic by the name of its option
+    def get(self, name):
+        if name == 'insts':
+            return self.get_insts()
+        if name == 'hot':
+            return self.get_hot()
+        if name == 'vars':
+            return self.max_vars
+        if name == 'stack':
+            return self.max_stack
+        if name == 'frames':
+            return self.max_frames
+        return self.max_calls
+
+    #This function writes chosen statistics to the file, every one on its own line in the order of names
+    def write(self, path, names):
+        with open(path, 'w') as file:
+            for name in names:
+                file.write(f'{self.get(name)}\n')
+
+#This action of the argument parser keeps the order of statistics options
+#--stats FILE starts a new group and every other statistics option belongs to the last group before it
+class StatsAction(argparse.Action):
+    def __call__(self, parser, namespace, values, option_string = None):
+        groups = namespace.stats if namespace.stats != None else []
+        if self.dest == 'stats':
+            groups.append((values, []))
+        else:
+            if len(groups) == 0:
+                groups.append((None, []))
+            groups[-1][1].append(self.dest)
+        namespace.stats = groups
+
 #This class has algorithms for all instructions processing, attributes for frames, stacks and statistics and simple interface for starting the processing
 class Interpret:
-    def __init__(self, program, input):
+    def __init__(self, program, input = None, output = None, errors = None, limits = NO_LIMITS):
         self.program = program
-        self.global_frame = Frame()
+        #Code of the run, quickening rewrites its instructions, so runs of the same Program do not change each other
+        self.code = list(program.fused_code)
+        self.quick_states = bytearray(len(self.code))
+        self.output = output if output != None else Output(sys.stdout)
+        self.errors = errors if errors != None else Output(sys.stderr)
+        self.global_frame = Frame(program.global_names, local = False)
+        self.global_frame.vars.extend(program.global_constants)
         self.local_frames = []
         self.temp_frame = None
+        #Frames by their codes for quickened instructions: global, the top local frame, temporary and the frame of literals
+        #Missing frames are None, every instruction which changes frames must update it
+        constants = Frame((), local = False)
+        constants.vars = program.constant_values
+        self.frames = [ self.global_frame, None, None, constants ]
         self.call_stack = []
         self.heap = []
         self.processed_instructions = 0
-        self.order = None
-        self.order_index = None
-        if input == sys.stdin:
-            self.input = sys.stdin
-        else:
-            try:
-                self.input = open(input, "r")
-            except:
-                sys.exit(11)
-
+        self.instr = None
+        self.order_index = 0
+        self.exit_code = None
+        #Profile of the run, if it is set, the program is processed by the profiling loop
+        self.profile = None
+        #Statistics of the run, if they are set, the program is processed by the counting loop
+        self.stats = None
+        #Functions of translated blocks of the program, they are made when the translated program is run for the first time
+        self.blocks = None
+        #Dispatch table, the handler of an instruction is found by the id of its opcode
+        self.handlers = [ getattr(self, opcode) for opcode in opcodes + fused_opcodes + special_opcodes + quick_opcodes ]
+        self.input = input if input != None else Input(sys.stdin.buffer)
+        self.set_limits(limits)
+
+    #This function enables the limits. Jumps and calls check the number of instructions, the time and the call depth themselves:
+    #they compare processed_instructions with next_check and the call stack with max_call_depth, which are UNLIMITED without
+    #the limits, so the run pays one comparison per jump or call. Handlers of PUSHS, CONCAT and READ are replaced
+    #by the checking ones only when their limits are set. Translated blocks and traces check the same values
+    def set_limits(self, limits):
+        self.limits = limits
+        self.start_time = time.perf_counter()
+        self.next_check = 0 if limits.instructions != None or limits.time != None else UNLIMITED
+        self.max_call_depth = limits.call_depth if limits.call_depth != None else UNLIMITED
+        self.max_string_size = limits.string_size if limits.string_size != None else UNLIMITED
+        self.limited_handlers = {}
+        if limits.data_stack != None:
+            self.wrap_handlers(('PUSHS',), self.LIMITED_PUSHS, self.limited_handlers)
+        if limits.string_size != None:
+            self.wrap_handlers(('CONCAT', 'READ'), self.LIMITED_STRING, self.limited_handlers)
+            self.wrap_handlers(('CONCAT_GF',), self.LIMITED_STRING_GF, self.limited_handlers)
+
+    #This function enables collecting of statistics. Instructions are counted by the loop, the same way as limits only
+    #the handlers which change frames and stacks are replaced. Initialized variables are not counted by every write:
+    #their number only grows until a temporary frame is thrown away, so it is counted before that and when the run ends
+    #It must be called before set_jit, so traces use the replaced handlers too
+    def set_stats(self, stats):
+        self.stats = stats
+        #Slots of global variables which are not initialized yet and numbers of initialized variables of local frames
+        #under the top one, these frames can not change until they are on the top again, so they are counted once
+        self.uninitialized_globals = list(range(len(self.program.global_names)))
+        self.frozen_vars = []
+        self.frozen_sum = 0
+        self.stats_handlers = {}
+        self.wrap_handlers(('CREATEFRAME', 'PUSHFRAME', 'POPFRAME', 'CALL_FRAME'), self.STATS_FRAME, self.stats_handlers)
+        self.wrap_handlers(('PUSHS', 'CALL'), self.STATS_DEPTH, self.stats_handlers)
+
+    #This function counts initialized variables in all frames for statistics
+    #Variables are not counted if there are not more defined variables than the highest number of initialized ones
+    def count_vars(self):
+        bound = len(self.program.global_names) + self.frozen_sum
+        if len(self.local_frames) != 0:
+            bound += len(self.local_frames[-1].vars)
+        if self.temp_frame != None:
+            bound += len(self.temp_frame.vars)
+        if bound <= self.stats.max_vars:
+            return
+        vars = self.global_frame.vars
+        self.uninitialized_globals = [ slot for slot in self.uninitialized_globals if vars[slot] is None or vars[slot] is UNINITIALIZED ]
+        count = len(self.program.global_names) - len(self.uninitialized_globals) + self.frozen_sum
+        if len(self.local_frames) != 0:
+            count += self.local_frames[-1].count_initialized()
+        if self.temp_frame != None:
+            count += self.temp_frame.count_initialized()
+        self.stats.add_vars(count)
+
+    #This function enables compiling of hot loops. Handlers of jumps are replaced by ones which count backward jumps,
+    #when a loop is hot, one pass of it is recorded and compiled by Trace and next passes run the compiled trace
+    #Traces run many instructions in one handler, so they are not used with the profile, which measures every instruction
+    def set_jit(self):
+        self.base_handlers = list(self.handlers)
+        self.jit_handlers = {}
+        self.loop_counts = {}
+        self.traces = {}
+        #Indexes of instructions of one pass of every trace, statistics count passes of the trace by them
+        self.trace_indexes = {}
+        self.wrap_handlers(('JUMP', 'JUMPIFEQ', 'JUMPIFNEQ', 'COMPARE_JUMP', 'COMPARE_JUMP_GF', 'JUMPIFEQ_INT', 'JUMPIFNEQ_INT',
+                            'COMPARE_JUMP_INT', 'JUMPIFEQ_STR', 'JUMPIFNEQ_STR', 'COMPARE_JUMP_STR'), self.TRACED_JUMP, self.jit_handlers)
+
+    #This function processes one pass of the loop starting at the target by the normal handlers and records it
+    #It returns the function of the compiled trace, or None if the pass is too long or the program ends in it
+    def record_trace(self, target):
+        code = self.program.code
+        records = []
+        try:
+            while len(records) < TRACE_LIMIT and self.order_index < len(code):
+                index = self.order_index
+                self.instr = code[index]
+                types = self.observe(self.instr)
+                self.base_handlers[self.instr.opcode]()
+                self.processed_instructions += 1
+                records.append((index, types, self.order_index))
+                if self.order_index == target:
+                    trace = Trace(self.program, target, records)
+                    trace.compile()
+                    self.trace_indexes[target] = [ index for index, types, next in records ]
+                    return trace.make_trace(self)
+            return None
+        finally:
+            if self.stats != None:
+                for index, types, next in records:
+                    self.stats.add_range(index, index + 1)
+
+    #This function returns types of arguments of the instruction, None for arguments which are not initialized symbols
+    def observe(self, instr):
+        types = []
+        for arg in instr.args:
+            value = None
+            if type(arg) is Var:
+                frame = self.frames[arg.frame]
+                value = frame.vars[arg.slot] if frame != None and (type(frame.vars) is list or arg.slot in frame.vars) else None
+            elif type(arg) is Value:
+                value = arg
+            types.append(value.type if value != None else None)
+        return tuple(types)
+
+    #This function replaces handlers of instructions by the wrapping handler, the original ones are saved in the dictionary
+    #Wrapping handlers call them from there, so more of them can be chained
+    def wrap_handlers(self, names, handler, saved):
+        for name in names:
+            saved[handler_ids[name]] = self.handlers[handler_ids[name]]
+            self.handlers[handler_ids[name]] = handler
+
+    #This function returns statistics of the run, they are a part of the result of the run and of the LimitError
+    def get_stats(self):
+        return { 'instructions': self.processed_instructions, 'time': time.perf_counter() - self.start_time,
+                 'call_depth': len(self.call_stack), 'data_stack': len(self.heap), 'local_frames': len(self.local_frames),
+                 'position': self.order_index + 1 }
+
+    #This function raises LimitError with the current statistics
+    #order is given by checks made after jumps and calls, it is the order of the instruction the run would continue with
+    def limit_exceeded(self, message, order = None):
+        raise LimitError(message, order, self.get_stats())
+
+    #This function checks the number of instructions and the wall time, it is called when processed_instructions reaches next_check
+    #Translated blocks and traces count their instructions at once, pending is the number of them which are not counted yet
+    def check_budget(self, pending = 0):
+        limits = self.limits
+        self.processed_instructions += pending
+        order = self.program.code[self.order_index].order
+        if limits.instructions != None and self.processed_instructions >= limits.instructions:
+            self.limit_exceeded(f'limit of {limits.instructions} instructions exceeded', order)
+        if limits.time != None and time.perf_counter() - self.start_time > limits.time:
+            self.limit_exceeded(f'limit of {limits.time} seconds exceeded', order)
+        self.next_check = self.processed_instructions + LIMIT_CHECK_INTERVAL
+        if limits.instructions != None:
+            self.next_check = min(self.next_check, limits.instructions)
+        self.processed_instructions -= pending
+
+    def call_depth_exceeded(self):
+        self.limit_exceeded(f'limit of call depth {self.limits.call_depth} exceeded', self.program.code[self.order_index].order)
 
     #This function returns the frame needed variable may be in
-    def define_frame(self, var_name):
-        frame_code = var_name[0:2].upper()
-        if frame_code == 'GF':
+    def define_frame(self, var):
+        if var.frame == GF:
             return self.global_frame
-        if frame_code == 'LF':
-            try:
-                frame = self.local_frames[-1]
-            except IndexError:
-                sys.exit(55)
-            return frame
-        if frame_code == 'TF':
-            if self.temp_frame == None:
-                sys.exit(55)
-            return self.temp_frame
-    
-    #This function checks if a var with that name is defined
-    def check_var_defined(self, var_name):
-        frame = self.define_frame(var_name)
-        if frame.check_var(var_name[3:]) == True:
-            return True
-        return False
-        
-
-    #This function checks if a var has value
-    def check_var_init(self, var_name):
-        frame = self.define_frame(var_name)
-        type = frame.get_var_type(var_name[3:])
-        if type == None:
-            return False
-        return True
-    
-    #This function returns value of a var with defined name
-    def get_var_value(self, var_name):
-        frame = self.define_frame(var_name)
-        return frame.get_var_value(var_name[3:])
-    
-    #This function returns type of a var with defined name
-    def get_var_type(self, var_name):
-        frame = self.define_frame(var_name)
-        return frame.get_var_type(var_name[3:])
-    
-    #This function sets value of a var with defined name
-    def set_var_value(self, var_name, value):
-        frame = self.define_frame(var_name)
-        frame.add_var(var_name[3:], value)
-
-    #This function parses the string and convert it into Python format
-    def parse_string(self, string):
-        decoded_chars = []
-        i = 0
-        while i < len(string):
-            c = string[i]
-            if c == "\\":
-                decimal_code = int(string[i+1:i+4])
-                if decimal_code in [ord("#"), ord("\\"), ord(" ")] or 0 <= decimal_code <= 32:
-                    decoded_chars.append(chr(decimal_code))
-                    i += 4
-                else:
-                    decoded_chars.append("\\" + string[i+1:i+4])
-                    i += 5
-            else:
-                decoded_chars.append(c)
-                i += 1
-        return "".join(decoded_chars)
-
-    #This function analyse the literal type and convert it into Python value
-    def get_value_from_literal(self, type, arg):
-        value = Value()
-        if type == 'int':
-            value.type = Value.Types.INT
-            value.value = int(arg)
-        elif type == 'bool':
-            value.type = Value.Types.BOOL
-            if arg == 'true':
-                value.value = True
-            else:
-                value.value = False
-        elif type == 'nil':
-            value.type = Value.Types.NIL
-            value.value = None
-        elif type == 'string':
-            value.type = Value.Types.STRING
-            value.value = self.parse_string(arg)
-        return value
-    
-    #This function checks if the label is in program
-    def check_label(self, label):
-        if label in self.program.labels:
-            return True
-        else:
-            return False
+        if var.frame == LF:
+            if len(self.local_frames) == 0:
+                raise FrameError('local frame does not exist')
+            return self.local_frames[-1]
+        if self.temp_frame == None:
+            raise FrameError('temporary frame does not exist')
+        return self.temp_frame
     
     #This help function analyse a symbol, check its definition and initialization and returns it's value
-    def get_symb_value(self, type, val):
-        if type == 'var':
-            if not self.check_var_defined(val):
-                sys.exit(54)
-            if not self.check_var_init(val):
-                sys.exit(56)
-            value = Value()
-            value.type = self.get_var_type(val)
-            value.value = self.get_var_value(val)
-        else:
-            value = self.get_value_from_literal(type, val)
+    #Literals are already decoded values from the constant pool of the program, they are returned as they are
+    #and must not be changed by the caller
+    def get_symb_value(self, symb):
+        if type(symb) is not Var:
+            return symb
+        try:
+            value = self.define_frame(symb).vars[symb.slot]
+        except KeyError:
+            value = None
+        if value is None:
+            raise UndefinedVariableError(f'variable {symb.name} is not defined')
+        if value is UNINITIALIZED:
+            raise MissingValueError(f'variable {symb.name} is not initialized')
         return value
     
+    #This help function checks that the result variable of instruction exists
+    #and returns the list of variables of its frame together with the slot of the variable in that list
+    def get_result_var(self):
+        var = self.instr.args[0]
+        vars = self.define_frame(var).vars
+        try:
+            if vars[var.slot] is None:
+                raise UndefinedVariableError(f'variable {var.name} is not defined')
+        except KeyError:
+            raise UndefinedVariableError(f'variable {var.name} is not defined')
+        return vars, var.slot
+
+    #This help function returns the value of the variable, or None if it is not defined in its frame
+    def get_var(self, var):
+        try:
+            return self.define_frame(var).vars[var.slot]
+        except KeyError:
+            return None
 
     #This help function realize checks of types and var existances for math instructions and returns two values
     def math(self):
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
-        symb1 = self.program.get_argument_value(self.order, 2)
-        type1 = self.program.get_argument_type(self.order, 2)
-        symb2 = self.program.get_argument_value(self.order, 3)
-        type2 = self.program.get_argument_type(self.order, 3)
+        result, slot = self.get_result_var()
+        value1 = self.get_symb_value(self.instr.args[1])
+        value2 = self.get_symb_value(self.instr.args[2])
 
-        value1 = self.get_symb_value(type1, symb1)
-        value2 = self.get_symb_value(type2, symb2)
+        if value1.type != INT or value2.type != INT:
+            raise OperandTypeError('wrong operand types')
 
-        if value1.type != Value.Types.INT or value2.type != Value.Types.INT:
-            sys.exit(53)
-
-        return var, value1, value2
+        return result, slot, value1, value2
     
-    #This help function realize all checks for relative instruction and returns two values, which can be easily compared
+    #This help function realize all checks for LT and GT instructions and returns two Python values, which can be easily compared
+    #Both operands must have the same type and nil can not be compared by them
     def relative(self):
-        symb1 = self.program.get_argument_value(self.order, 2)
-        type1 = self.program.get_argument_type(self.order, 2)
-        symb2 = self.program.get_argument_value(self.order, 3)
-        type2 = self.program.get_argument_type(self.order, 3)
-    
-        value1 = self.get_symb_value(type1, symb1)
-        value2 = self.get_symb_value(type2, symb2)
-
-        if value1.type != Value.Types.NIL and value2.type != Value.Types.NIL:
-            if value1.type != value2.type:
-                sys.exit(53)
-        if value1.type == Value.Types.NIL and value2.type == Value.Types.NIL:
-            sys.exit(53)
+        value1 = self.get_symb_value(self.instr.args[1])
+        value2 = self.get_symb_value(self.instr.args[2])
+
+        if value1.type != value2.type or value1.type == NIL:
+            raise OperandTypeError('wrong operand types')
         
-        #The main idea of that two if is following:
-        #Python specification says that any string * 0 is an emplty string
-        #Any bool value * 0 is false
-        #And math rules say that any integer * 0 is 0
-        #So in case of NIL value, we turn it's type on the second operator's type, and set the value to fact zero by multiplying second's value by 0
-        #In the end we have two operands with the same type, and one of them still represents NIL value (false, '' or 0)
-        #So we can easily compare that values
-        if value1.type == Value.Types.NIL:
-            value1.type == value2.type
-            value1.value = value2.value * 0
-        if value2.type == Value.Types.NIL:
-            value2.type == value1.type
-            value2.value = value1.value * 0
+        return value1.value, value2.value
+
+    #This help function realize all checks for EQ and conditional jumps and returns the result of comparison
+    #Operands must have the same type, except of nil, which can be compared with anything and equals only nil
+    def equality(self, symb1, symb2):
+        value1 = self.get_symb_value(symb1)
+        value2 = self.get_symb_value(symb2)
+
+        if value1.type != value2.type:
+            if value1.type != NIL and value2.type != NIL:
+                raise OperandTypeError('wrong operand types')
+            return False
         
-        return value1, value2
+        return value1.value == value2.value
     
     #This help function realize all checks for logic instructions and returns two real bool values
     def logic(self):
-        symb1 = self.program.get_argument_value(self.order, 2)
-        type1 = self.program.get_argument_type(self.order, 2)
-        symb2 = self.program.get_argument_value(self.order, 3)
-        type2 = self.program.get_argument_type(self.order, 3)
-
-        value1 = self.get_symb_value(type1, symb1)
-        value2 = self.get_symb_value(type2, symb2)
+        value1 = self.get_symb_value(self.instr.args[1])
+        value2 = self.get_symb_value(self.instr.args[2])
 
-        if value1.type != Value.Types.BOOL or value2.type != Value.Types.BOOL:
-            sys.exit(53)
+        if value1.type != BOOL or value2.type != BOOL:
+            raise OperandTypeError('wrong operand types')
         
         return value1.value, value2.value
     
-    #This function will process all instruction from the first one
+    #This function rewrites the instruction being processed to its quickened variant for the types of its operands
+    #It is called by the normal handler only for instructions in the QUICK_NEW state, every instruction is examined once
+    #Instructions without a variant for the types, and parts of superinstructions processed by their own handlers, are never quickened
+    def quicken(self, name, symb1, symb2):
+        instr = self.instr
+        index = self.order_index
+        type1 = self.get_symb_value(symb1).type
+        name += quick_suffixes.get(type1, '')
+        if self.code[index] is instr and type1 in quick_suffixes and type1 == self.get_symb_value(symb2).type and name in handler_ids:
+            args = []
+            for arg in instr.args[:3]:
+                if type(arg) is Var:
+                    args += [ arg.frame, arg.slot ]
+                elif type(arg) is Value:
+                    args += [ CF, self.program.constant_slots[id(arg)] ]
+                else:
+                    args.append(arg)
+            args += instr.args[3:]
+            args.append(instr)
+            self.code[index] = Instruction(instr.order, handler_ids[name], tuple(args))
+            self.quick_states[index] = QUICK_DONE
+        else:
+            self.quick_states[index] = QUICK_NEVER
+
+    #This function is called by the quickened handler when its checks do not pass, it rewrites the instruction back
+    #to the normal one for the rest of the run and processes it by the normal handler, which finds the right error if there is any
+    def deoptimize(self):
+        self.instr = self.instr.args[-1]
+        self.code[self.order_index] = self.instr
+        self.quick_states[self.order_index] = QUICK_NEVER
+        self.handlers[self.instr.opcode]()
+
+    #This function will process all instruction from the first one and returns the exit code of the program
+    #Errors are raised as InterpretError with the order of the instruction which caused them
+    #Buffered output is written out when the program ends in any way, including EXIT and errors
     def process_program(self):
-        self.order_index = 0
-        while True:
-            if self.order_index >= len(self.program.orders):
-                break
-            self.order = self.program.orders[self.order_index]
-            opcode = self.program.get_instruction(self.order).upper()
-            eval("self." + opcode + "()")
+        try:
+            self.process_instructions()
+        finally:
+            self.output.flush()
+            self.errors.flush()
+            if self.stats != None:
+                #Frames under the top one are counted again, the run may end in the middle of a superinstruction which changed them
+                self.frozen_vars = [ frame.count_initialized() for frame in self.local_frames[:-1] ]
+                self.frozen_sum = sum(self.frozen_vars)
+                self.count_vars()
+        return self.exit_code
+
+    #This function continues processing from the current instruction
+    #If count is given, at most count instructions are processed, so the program can be run by parts
+    #It returns True when the program has ended and its exit code is in exit_code,
+    #or False when the count was reached or READ waits for input which is not available yet
+    def process_instructions(self, count = None):
+        code = self.code
+        handlers = self.handlers
+        try:
+            if self.profile != None:
+                if not self.profile_instructions(count):
+                    return False
+            elif self.stats != None:
+                if not self.count_instructions(count):
+                    return False
+            elif self.program.translation != None:
+                if not self.translated_instructions(count):
+                    return False
+            elif count == None:
+                while self.order_index < len(code):
+                    self.instr = code[self.order_index]
+                    handlers[self.instr.opcode]()
+                    self.processed_instructions += 1
+            else:
+                end = self.processed_instructions + count
+                while self.order_index < len(code):
+                    if self.processed_instructions >= end:
+                        return False
+                    self.instr = code[self.order_index]
+                    handlers[self.instr.opcode]()
+                    self.processed_instructions += 1
+        except ProgramExit as exit:
+            #Loops count instructions after their handlers return, EXIT does not return, so it is counted here
+            if self.profile != None:
+                self.profile.counts[self.order_index] += 1
+            elif self.stats != None:
+                self.stats.counts[self.order_index] += 1
+            self.exit_code = exit.code
+            return True
+        except InputPending:
+            return False
+        except InterpretError as error:
+            if error.order == None:
+                error.order = self.instr.order
+            raise
+        self.exit_code = 0
+        return True
+
+    #This function is the main loop used when the profile is collected, it is separate so the normal loop does not pay for profiling
+    #It returns False when the count was reached
+    def profile_instructions(self, count):
+        code = self.program.code
+        handlers = self.handlers
+        counts = self.profile.counts
+        times = self.profile.times
+        clock = time.perf_counter
+        end = self.processed_instructions + count if count != None else None
+        while self.order_index < len(code):
+            if end != None and self.processed_instructions >= end:
+                return False
+            index = self.order_index
+            self.instr = code[index]
+            start = clock()
+            try:
+                handlers[self.instr.opcode]()
+            finally:
+                times[index] += clock() - start
+            counts[index] += 1
             self.processed_instructions += 1
+        return True
+
+    #This function is the main loop used when the program is translated to Python
+    #It calls functions of blocks, which return the index of the next block, instructions out of blocks are processed one by one
+    #It returns False when the count was reached
+    def translated_instructions(self, count):
+        if self.blocks == None:
+            self.blocks = self.program.translation.make_blocks(self)
+        code = self.code
+        handlers = self.handlers
+        blocks = self.blocks
+        end = self.processed_instructions + count if count != None else None
+        while self.order_index < len(code):
+            if end != None and self.processed_instructions >= end:
+                return False
+            block = blocks.get(self.order_index)
+            if block != None:
+                self.order_index = block()
+            else:
+                self.instr = code[self.order_index]
+                handlers[self.instr.opcode]()
+                self.processed_instructions += 1
+        return True
+
+    #This function is the main loop used when statistics are collected, it processes the code of the run as the normal loop
+    #and blocks of the translated program as translated_instructions does, and counts them by the index where they start
+    #Instructions are counted after their handlers return, so an instruction processed again after InputPending is counted once
+    #It returns False when the count was reached
+    def count_instructions(self, count):
+        code = self.code
+        handlers = self.handlers
+        stats = self.stats
+        counts = stats.counts
+        ranges = stats.ranges
+        end = self.processed_instructions + count if count != None else UNLIMITED
+        index = self.order_index
+        try:
+            if self.program.translation != None:
+                if self.blocks == None:
+                    self.blocks = self.program.translation.make_blocks(self)
+                blocks = self.blocks
+                while self.order_index < len(code):
+                    if self.processed_instructions >= end:
+                        return False
+                    index = self.order_index
+                    block = blocks.get(index)
+                    if block != None:
+                        start = self.processed_instructions
+                        self.order_index = block()
+                        ranges[index] += 1
+                        ranges[index + self.processed_instructions - start] -= 1
+                    else:
+                        self.instr = code[index]
+                        handlers[self.instr.opcode]()
+                        counts[index] += 1
+                        self.processed_instructions += 1
+            elif count == None:
+                while self.order_index < len(code):
+                    index = self.order_index
+                    self.instr = code[index]
+                    handlers[self.instr.opcode]()
+                    counts[index] += 1
+                    self.processed_instructions += 1
+            else:
+                while self.order_index < len(code):
+                    if self.processed_instructions >= end:
+                        return False
+                    index = self.order_index
+                    self.instr = code[index]
+                    handlers[self.instr.opcode]()
+                    counts[index] += 1
+                    self.processed_instructions += 1
+        except Exception:
+            #Parts of the superinstruction, block or trace processed before the exception are counted too
+            stats.add_rest(index, self.processed_instructions)
+            raise
+        return True
 
     #Each instruction has it's own function and processing algorithm
 
     def MOVE(self): #<var> <symb>
-        arg1 = self.program.get_argument_value(self.order, 1)
-        if self.check_var_defined(arg1) == False:
-            sys.exit(54)
-        arg2 = self.program.get_argument_value(self.order, 2)
-        arg_type = self.program.get_argument_type(self.order, 2)
-        if arg_type == 'var':
-            if self.check_var_defined(arg2) == False:
-                sys.exit(54)
-            if self.check_var_init(arg2) == False:
-                sys.exit(56)
-            self.set_var_value(arg1, self.get_var_value(arg2))
-        else:
-            value = self.get_value_from_literal(arg_type, arg2)
-            self.set_var_value(arg1, value)
-
+        result, slot = self.get_result_var()
+        value = self.get_symb_value(self.instr.args[1])
+        result[slot] = value
         self.order_index += 1
     
     def CREATEFRAME(self):
-        self.temp_frame = Frame()
+        self.temp_frame = Frame(self.program.local_names)
+        self.frames[TF] = self.temp_frame
         self.order_index += 1
     
     def PUSHFRAME(self):
         if self.temp_frame == None:
-            sys.exit(55)
+            raise FrameError('temporary frame does not exist')
         self.local_frames.append(self.temp_frame)
+        self.frames[LF] = self.temp_frame
         self.temp_frame = None
+        self.frames[TF] = None
         self.order_index += 1
     
     def POPFRAME(self):
         if len(self.local_frames) == 0:
-            sys.exit(55)
-        self.temp_frame == self.local_frames.pop()
+            raise FrameError('local frame does not exist')
+        self.temp_frame = self.local_frames.pop()
+        self.frames[TF] = self.temp_frame
+        self.frames[LF] = self.local_frames[-1] if len(self.local_frames) != 0 else None
         self.order_index += 1
     
     def DEFVAR(self):   #<var>
-        var = self.program.get_argument_value(self.order, 1)
-        if self.check_var_defined(var) == True:
-            sys.exit(52)
-        self.set_var_value(var, Value())
+        var = self.instr.args[0]
+        vars = self.define_frame(var).vars
+        if var.slot in vars if type(vars) is dict else vars[var.slot] is not None:
+            raise SemanticError(f'variable {var.name} is already defined')
+        vars[var.slot] = UNINITIALIZED
         self.order_index += 1
     
     def CALL(self): #<label>
-        label = self.program.get_argument_value(self.order, 1)
-        if not self.check_label(label):
-            sys.exit(52)
         self.call_stack.append(self.order_index + 1)
-        self.order_index = self.program.orders.index(self.program.labels[label])
+        self.order_index = self.instr.args[0]
+        if len(self.call_stack) > self.max_call_depth:
+            self.call_depth_exceeded()
+        if self.processed_instructions >= self.next_check:
+            self.check_budget()
 
     def RETURN(self):
         if len(self.call_stack) == 0:
-            sys.exit(56)
+            raise MissingValueError('call stack is empty')
         ret_index = self.call_stack.pop()
         self.order_index = ret_index
         return
     
     def PUSHS(self):    #<symb>
-        symb = self.program.get_argument_value(self.order, 1)
-        type = self.program.get_argument_type(self.order, 1)
-        value = Value()
-        if type == 'var':
-            if self.check_var_defined(symb) == False:
-                sys.exit(54)
-            if self.check_var_init(symb) == False:
-                sys.exit(56)
-            value.type = self.get_var_type(symb)
-            value.value = self.get_var_value(symb)
-        else:
-            value = self.get_value_from_literal(type, symb)
-
+        value = self.get_symb_value(self.instr.args[0])
         self.heap.append(value)
         self.order_index += 1
 
     def POPS(self): #<var>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
+        result, slot = self.get_result_var()
         if len(self.heap) == 0:
-            sys.exit(56)
+            raise MissingValueError('data stack is empty')
         value = self.heap.pop()
-        self.set_var_value(var, value)
+        result[slot] = value
         self.order_index += 1
         
     def ADD(self):  #<var> <symb1> <symb2>
-        var, value1, value2 = self.math()
-        newValue = Value()
-        newValue.set_value(Value.Types.INT, value1.value + value2.value)
-        self.set_var_value(var, newValue)
+        result, slot, value1, value2 = self.math()
+        newValue = Value(INT, value1.value + value2.value)
+        result[slot] = newValue
+        if self.quick_states[self.order_index] == QUICK_NEW:
+            self.quicken('ADD', self.instr.args[1], self.instr.args[2])
         self.order_index += 1
 
     def SUB(self):  #<var> <symb1> <symb2>
-        var, value1, value2 = self.math()
-        newValue = Value()
-        newValue.set_value(Value.Types.INT, value1.value - value2.value)
-        self.set_var_value(var, newValue)
+        result, slot, value1, value2 = self.math()
+        newValue = Value(INT, value1.value - value2.value)
+        result[slot] = newValue
+        if self.quick_states[self.order_index] == QUICK_NEW:
+            self.quicken('SUB', self.instr.args[1], self.instr.args[2])
         self.order_index += 1
 
     def MUL(self):  #<var> <symb1> <symb2>
-        var, value1, value2 = self.math()
-        newValue = Value()
-        newValue.set_value(Value.Types.INT, value1.value * value2.value)
-        self.set_var_value(var, newValue)
+        result, slot, value1, value2 = self.math()
+        newValue = Value(INT, value1.value * value2.value)
+        result[slot] = newValue
+        if self.quick_states[self.order_index] == QUICK_NEW:
+            self.quicken('MUL', self.instr.args[1], self.instr.args[2])
         self.order_index += 1
 
     def IDIV(self): #<var> <symb1> <symb2>
-        var, value1, value2 = self.math()
+        result, slot, value1, value2 = self.math()
         if value2.value == 0:
-            sys.exit(57)
-        newValue = Value()
-        newValue.set_value(Value.Types.INT, value1.value // value2.value)
-        self.set_var_value(var, newValue)
+            raise OperandValueError('division by zero')
+        newValue = Value(INT, value1.value // value2.value)
+        result[slot] = newValue
         self.order_index += 1
     
     def LT(self):   #<var> <symb1> <symb2>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
+        result, slot = self.get_result_var()
         value1, value2 = self.relative()
-        newValue = Value()
-        newValue.set_value(value1.type, value1.value < value2.value)
-        self.set_var_value(var, newValue)
+        result[slot] = TRUE_VALUE if value1 < value2 else FALSE_VALUE
+        if self.quick_states[self.order_index] == QUICK_NEW:
+            self.quicken('LT', self.instr.args[1], self.instr.args[2])
         self.order_index += 1
 
     def GT(self):   #<var> <symb1> <symb2>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
+        result, slot = self.get_result_var()
         value1, value2 = self.relative()
-        newValue = Value()
-        newValue.set_value(value1.type, value1.value > value2.value)
-        self.set_var_value(var, newValue)
+        result[slot] = TRUE_VALUE if value1 > value2 else FALSE_VALUE
+        if self.quick_states[self.order_index] == QUICK_NEW:
+            self.quicken('GT', self.instr.args[1], self.instr.args[2])
         self.order_index += 1
     
     def EQ(self):   #<var> <symb1> <symb2>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
-        value1, value2 = self.relative()
-        newValue = Value()
-        newValue.set_value(value1.type, value1.value == value2.value)
-        self.set_var_value(var, newValue)
+        result, slot = self.get_result_var()
+        equal = self.equality(self.instr.args[1], self.instr.args[2])
+        result[slot] = TRUE_VALUE if equal else FALSE_VALUE
+        if self.quick_states[self.order_index] == QUICK_NEW:
+            self.quicken('EQ', self.instr.args[1], self.instr.args[2])
         self.order_index += 1
     
     def AND(self):  #<var> <symb1> <symb2>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
-        
+        result, slot = self.get_result_var()
         bool1, bool2 = self.logic()
-        value = Value()
-        value.set_value(bool, bool1 and bool2)
-        self.set_var_value(var, value)
+        result[slot] = TRUE_VALUE if bool1 and bool2 else FALSE_VALUE
         self.order_index += 1
 
     def OR(self):  #<var> <symb1> <symb2>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
-        
+        result, slot = self.get_result_var()
         bool1, bool2 = self.logic()
-        value = Value()
-        value.set_value(bool, bool1 or bool2)
-        self.set_var_value(var, value)
+        result[slot] = TRUE_VALUE if bool1 or bool2 else FALSE_VALUE
         self.order_index += 1
 
     def NOT(self):  #<var> <symb>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
-        
-        symb = self.program.get_argument_value(self.order, 2)
-        type = self.program.get_argument_type(self.order, 2)
-        value = self.get_symb_value(type, symb)
-        if value.type != Value.Types.BOOL:
-            sys.exit(53)
-        value.set_value(bool, not value.value)
-        self.set_var_value(var, value)
+        result, slot = self.get_result_var()
+        value = self.get_symb_value(self.instr.args[1])
+        if value.type != BOOL:
+            raise OperandTypeError('wrong operand types')
+        result[slot] = FALSE_VALUE if value.value else TRUE_VALUE
         self.order_index += 1
 
     def INT2CHAR(self): #<var> <symb>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
-
-        symb = self.program.get_argument_value(self.order, 2)
-        type = self.program.get_argument_type(self.order, 2)
-
-        value = self.get_symb_value(type, symb)
-        if value.type != Value.Types.INT:
-            sys.exit(53)
+        result, slot = self.get_result_var()
+        value = self.get_symb_value(self.instr.args[1])
+        if value.type != INT:
+            raise OperandTypeError('wrong operand types')
 
         try:
             unicode_char = chr(value.value)
         except ValueError:
-            sys.exot(58)
+            raise StringError(f'{value.value} is not a valid Unicode code point')
 
-        newValue = Value()
-        newValue.set_value(Value.Types.STRING, unicode_char)
-        self.set_var_value(var, newValue)
+        newValue = Value(STRING, unicode_char)
+        result[slot] = newValue
         self.order_index += 1
     
     def STRI2INT(self): #<var> <symb1> <symb2>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
-
-        symb1 = self.program.get_argument_value(self.order, 2)
-        type1 = self.program.get_argument_type(self.order, 2)
-        symb2 = self.program.get_argument_value(self.order, 3)
-        type2 = self.program.get_argument_type(self.order, 3)
-
-        value1 = self.get_symb_value(type1, symb1)
-        value2 = self.get_symb_value(type2, symb2)
+        result, slot = self.get_result_var()
+        value1 = self.get_symb_value(self.instr.args[1])
+        value2 = self.get_symb_value(self.instr.args[2])
 
-        if value1.type != Value.Types.STRING or value2.type != Value.Types.INT:
-            sys.exit(53)
+        if value1.type != STRING or value2.type != INT:
+            raise OperandTypeError('wrong operand types')
         
-        if value2.value >= len(value1.value):
-            sys.exit(58)
+        if value2.value < 0 or value2.value >= len(value1.value):
+            raise StringError('index out of range')
         
-        newValue = Value()
-        newValue.type = Value.Types.STRING
-        newValue.value = ord(value1.value[value2.value])
-        self.set_var_value(var, newValue)
+        newValue = Value(INT, ord(value1.value[value2.value]))
+        result[slot] = newValue
         self.order_index += 1
 
 
     def READ(self): #<var> <type>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
-
-        needed_type = self.program.get_argument_value(self.order, 2)
-        value = Value()
-        try:
-            if needed_type == 'int':
-                inp = int(self.input.readline().rstrip())
-                value.type = Value.Types.INT
-                value.value = inp
-            elif needed_type == 'bool':
-                inp = self.input.readline().rstrip()
-                if inp == 'true':
-                    value.value = True
+        result, slot = self.get_result_var()
+        needed_type = self.instr.args[1]
+        #Lines which can not be read or decoded give nil, InputPending of asynchronous input is let through
+        try:
+            inp = self.input.readline()
+            if inp == None:
+                value = NIL_VALUE
+            else:
+                inp = inp.rstrip()
+                if needed_type == 'int':
+                    value = Value(INT, int(inp))
+                elif needed_type == 'bool':
+                    value = TRUE_VALUE if inp == 'true' else FALSE_VALUE
+                elif needed_type == 'string':
+                    value = Value(STRING, inp)
                 else:
-                    value.value = False
-                value.type = Value.Types.BOOL
-            elif needed_type == 'string':
-                inp = self.input.readline().rstrip()
-                value.type = Value.Types.STRING
-                value.value = inp
-        except:
-            value.type = Value.Types.NIL
+                    value = NIL_VALUE
+        except (ValueError, OSError):
+            value = NIL_VALUE
 
-        self.set_var_value(var, value)
+        result[slot] = value
         self.order_index += 1
     
     def WRITE(self):    #<symb>
-        symb = self.program.get_argument_value(self.order, 1)
-        type = self.program.get_argument_type(self.order, 1)
-        value = self.get_symb_value(type, symb)
-        if value.type == Value.Types.INT or value.type == Value.Types.STRING:
-            print(value.value, end='')
-        elif value.type == Value.Types.NIL:
-            print('', end='')
-        else:
-            if value.value == True:
-                print('true', end='')
-            else:
-                print('false', end='')
+        value = self.get_symb_value(self.instr.args[0])
+        if value.type == STRING:
+            self.output.write(value.value)
+        elif value.type == INT:
+            self.output.write(str(value.value))
+        elif value.type == BOOL:
+            self.output.write('true' if value.value else 'false')
         self.order_index += 1
     
     def CONCAT(self):   #<var> <symb1> <symb2>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
+        result, slot = self.get_result_var()
+        value1 = self.get_symb_value(self.instr.args[1])
+        value2 = self.get_symb_value(self.instr.args[2])
 
-        symb1 = self.program.get_argument_value(self.order, 2)
-        type1 = self.program.get_argument_type(self.order, 2)
-        symb2 = self.program.get_argument_value(self.order, 3)
-        type2 = self.program.get_argument_type(self.order, 3)
+        if value1.type != STRING or value2.type != STRING:
+            raise OperandTypeError('wrong operand types')
+        value = Value(STRING, value1.value + value2.value)
 
-        value1 = self.get_symb_value(type1, symb1)
-        value2 = self.get_symb_value(type2, symb2)
-
-        if value1.type != Value.Types.STRING or value2.type != Value.Types.STRING:
-            sys.exit(53)
-        value = Value()
-        value.type = Value.Types.STRING
-        value.value = value1.value + value2.value
-
-        self.set_var_value(var, value)
+        result[slot] = value
         self.order_index += 1
 
     def STRLEN(self):   #<var> <symb>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
+        result, slot = self.get_result_var()
+        val = self.get_symb_value(self.instr.args[1])
 
-        symb = self.program.get_argument_value(self.order, 2)
-        type = self.program.get_argument_type(self.order, 2)
-        val = self.get_symb_value(type, symb)
-
-        if val.type != Value.Types.STRING:
-            sys.exit(53)
-        value = Value()
-        value.type = Value.Types.INT
-        value.value = len(val.value)
-        self.set_var_value(var, value)
+        if val.type != STRING:
+            raise OperandTypeError('wrong operand types')
+        value = Value(INT, len(val.value))
+        result[slot] = value
         self.order_index += 1
 
     def GETCHAR(self):  #<var> <symb1> <symb2>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
-
-        symb1 = self.program.get_argument_value(self.order, 2)
-        type1 = self.program.get_argument_type(self.order, 2)
-        symb2 = self.program.get_argument_value(self.order, 3)
-        type2 = self.program.get_argument_type(self.order, 3)
+        result, slot = self.get_result_var()
+        value1 = self.get_symb_value(self.instr.args[1])
+        value2 = self.get_symb_value(self.instr.args[2])
 
-        value1 = self.get_symb_value(type1, symb1)
-        value2 = self.get_symb_value(type2, symb2)
+        if value1.type != STRING or value2.type != INT:
+            raise OperandTypeError('wrong operand types')
+        if value2.value < 0 or value2.value >= len(value1.value):
+            raise StringError('index out of range')
 
-        if value1.type != Value.Types.STRING or value2.type != Value.Types.INT:
-            sys.exit(53)
-        if value2.value >= len(value1.value):
-            sys.exit(58)
-
-        value = Value()
-        value.type = Value.Types.STRING
-        value.value = value1.value[value2.value]
-        self.set_var_value(var, value)
+        value = Value(STRING, value1.value[value2.value])
+        result[slot] = value
         self.order_index += 1
 
     def SETCHAR(self):  #<var> <symb1> <symb2>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
-        if not self.check_var_init(var):
-            sys.exit(56)
-
-        var_val = self.program.get_argument_value(self.order, 1)
-        var_type = self.program.get_argument_type(self.order, 1)
-        symb1 = self.program.get_argument_value(self.order, 2)
-        type1 = self.program.get_argument_type(self.order, 2)
-        symb2 = self.program.get_argument_value(self.order, 3)
-        type2 = self.program.get_argument_type(self.order, 3)
-
-        value1 = self.get_symb_value(var_type, var_val)
-        value2 = self.get_symb_value(type1, symb1)
-        value3 = self.get_symb_value(type2, symb2)
-
-        if value1.type != Value.Types.STRING or value2.type != Value.Types.INT or value3.type != Value.Types.STRING:
-            sys.exit(53)
-        if value2.value >= len(value1.value):
-            sys.exit(58)
-
-        print(value1.value)
-        print(value2.value)
-        print(value3.value)
-        value = Value()
-        value.type = Value.Types.STRING
-        value.value = value1.value[:value2.value] + value3.value[0] + value1.value[value2.value + 1:]
-        self.set_var_value(var, value)
+        result, slot = self.get_result_var()
+        value1 = self.get_symb_value(self.instr.args[0])
+        value2 = self.get_symb_value(self.instr.args[1])
+        value3 = self.get_symb_value(self.instr.args[2])
+
+        if value1.type != STRING or value2.type != INT or value3.type != STRING:
+            raise OperandTypeError('wrong operand types')
+        if value2.value < 0 or value2.value >= len(value1.value) or len(value3.value) == 0:
+            raise StringError('index out of range')
+
+        value = Value(STRING, value1.value[:value2.value] + value3.value[0] + value1.value[value2.value + 1:])
+        result[slot] = value
         self.order_index += 1
 
     def TYPE(self): #<var> <symb>
-        var = self.program.get_argument_value(self.order, 1)
-        if not self.check_var_defined(var):
-            sys.exit(54)
-
-        symb = self.program.get_argument_value(self.order, 2)
-        type = self.program.get_argument_type(self.order, 2)
-        val = self.get_symb_value(type, symb)
-
-        value = Value()
-        value.type = Value.Types.STRING
-        if val.type == Value.Types.INT:
-            value.value = 'int'
-        elif val.type == Value.Types.STRING:
-            value.value = 'string'
-        elif val.type == Value.Types.BOOL:
-            value.value = 'bool'
-        elif val.type == Value.Types.NIL:
-            value.value = 'nil'
+        result, slot = self.get_result_var()
+        symb = self.instr.args[1]
+        if type(symb) is Var:
+            val = self.get_var(symb)
+            if val is None:
+                raise UndefinedVariableError(f'variable {symb.name} is not defined')
         else:
-            value.value = ''
-        
-        self.set_var_value(var, value)
+            val = symb
+
+        result[slot] = type_values[val.type]
         self.order_index += 1
 
     def LABEL(self):
@@ -761,103 +1828,1380 @@ class Interpret:
         return
     
     def JUMP(self): #<label>
-        label = self.program.get_argument_value(self.order, 1)
-        if not self.check_label(label):
-            sys.exit(52)
-        self.order_index = self.program.orders.index(self.program.labels[label])
+        self.order_index = self.instr.args[0]
+        if self.processed_instructions >= self.next_check:
+            self.check_budget()
 
     def JUMPIFEQ(self): #<label> <symb1> <symb2>
-        label = self.program.get_argument_value(self.order, 1)
-        if not self.check_label(label):
-            sys.exit(52)
-
-        value1, value2 = self.relative()
-        if value1.value == value2.value:
-            self.order_index = self.program.orders.index(self.program.labels[label])
+        equal = self.equality(self.instr.args[1], self.instr.args[2])
+        if self.quick_states[self.order_index] == QUICK_NEW:
+            self.quicken('JUMPIFEQ', self.instr.args[1], self.instr.args[2])
+        if equal:
+            self.order_index = self.instr.args[0]
+            if self.processed_instructions >= self.next_check:
+                self.check_budget()
         else:
             self.order_index += 1
 
     def JUMPIFNEQ(self):    #<label> <symb1> <symb2>
-        label = self.program.get_argument_value(self.order, 1)
-        if not self.check_label(label):
-            sys.exit(52)
-
-        value1, value2 = self.relative()
-        if value1.value != value2.value:
-            self.order_index = self.program.orders.index(self.program.labels[label])
+        equal = self.equality(self.instr.args[1], self.instr.args[2])
+        if self.quick_states[self.order_index] == QUICK_NEW:
+            self.quicken('JUMPIFNEQ', self.instr.args[1], self.instr.args[2])
+        if not equal:
+            self.order_index = self.instr.args[0]
+            if self.processed_instructions >= self.next_check:
+                self.check_budget()
         else:
             self.order_index += 1
 
     def EXIT(self): #<symb>
-        type = self.program.get_argument_type(self.order, 1)
-        val = self.program.get_argument_value(self.order, 1)
-        value = self.get_symb_value(type, val)
-        if value.type != Value.Types.INT:
-            sys.exit(53)
+        value = self.get_symb_value(self.instr.args[0])
+        if value.type != INT:
+            raise OperandTypeError('wrong operand types')
         if value.value < 0 or value.value > 49:
-            sys.exit(57)
-        sys.exit(value.value)
+            raise OperandValueError(f'exit code {value.value} is out of range 0-49')
+        raise ProgramExit(value.value)
 
     
     def DPRINT(self):   #<symb>
-        symb = self.program.get_argument_value(self.order, 1)
-        type = self.program.get_argument_type(self.order, 1)
-        value = self.get_symb_value(type, symb)
-        sys.stderr.write(str(value.value))
+        value = self.get_symb_value(self.instr.args[0])
+        self.errors.write(str(value.value))
         self.order_index += 1
 
     def BREAK(self):
-        sys.stderr.write("###############\n")
-        sys.stderr.write("INTERPRET STATE\n")
-        sys.stderr.write("\tGLOBAL FRAME:\n")
-        for elem in self.global_frame.vars:
-            sys.stderr.write(f"\t\tVar name: {elem},\ttype: {self.global_frame.vars[elem].type},\tvalue: {self.global_frame.vars[elem].value}\n")
-        sys.stderr.write("\tLOCAL FRAMES:\n")
+        self.errors.write("###############\n")
+        self.errors.write("INTERPRET STATE\n")
+        self.errors.write("\tGLOBAL FRAME:\n")
+        for name, value in self.global_frame.get_defined_vars():
+            self.errors.write(f"\t\tVar name: {name},\ttype: {type_names.get(value.type)},\tvalue: {value.value}\n")
+        self.errors.write("\tLOCAL FRAMES:\n")
         lf_count = 0
         for frame in self.local_frames:
-            sys.stderr.write(f"\t\tLOCAL FRAME {lf_count + 1}\n")
-            for elem in self.local_frames[lf_count].vars:
-                sys.stderr.write(f"\t\t\tVar name: {elem},\ttype: {self.local_frames[lf_count].vars[elem].type},\tvalue: {self.local_frames[lf_count].vars[elem].value}\n")
+            self.errors.write(f"\t\tLOCAL FRAME {lf_count + 1}\n")
+            for name, value in frame.get_defined_vars():
+                self.errors.write(f"\t\t\tVar name: {name},\ttype: {type_names.get(value.type)},\tvalue: {value.value}\n")
             lf_count += 1
-        sys.stderr.write("\tTEMPORARY FRAME:\n")
+        self.errors.write("\tTEMPORARY FRAME:\n")
         if self.temp_frame == None:
-            sys.stderr.write("\t\tNOT DEFINED\n")
+            self.errors.write("\t\tNOT DEFINED\n")
         else:
-            for elem in self.temp_frame.vars:
-                sys.stderr.write(f"\t\tVar name: {elem},\ttype: {self.temp_frame.vars[elem].type},\tvalue: {self.temp_frame.vars[elem].value}\n")
-        sys.stderr.write(f"\tPROCESSED INSTRUCTIONS COUNT: {self.processed_instructions}\n")
-        sys.stderr.write(f"\tPOSITION IN CODE: {self.order_index + 1}\n")
-        sys.stderr.write("\tCALL STACK:\n")
+            for name, value in self.temp_frame.get_defined_vars():
+                self.errors.write(f"\t\tVar name: {name},\ttype: {type_names.get(value.type)},\tvalue: {value.value}\n")
+        self.errors.write(f"\tPROCESSED INSTRUCTIONS COUNT: {self.processed_instructions}\n")
+        self.errors.write(f"\tPOSITION IN CODE: {self.order_index + 1}\n")
+        self.errors.write("\tCALL STACK:\n")
         if len(self.call_stack) != 0:
-            sys.stderr.write("\t\t")
+            self.errors.write("\t\t")
         for elem in self.call_stack:
-            sys.stderr.write(f"{elem} - ")
+            self.errors.write(f"{elem} - ")
         if len(self.call_stack) != 0:
-            sys.stderr.write("\n")
-        sys.stderr.write("\tHEAP:\n")
+            self.errors.write("\n")
+        self.errors.write("\tHEAP:\n")
         for elem in self.heap:
-            sys.stderr.write(f"\t\ttype: {elem.type},\tvalue: {elem.value}\n")
-        sys.stderr.write("###############\n")
-        self.order_index += 1
-
-if '--help' in sys.argv and len(sys.argv) != 2:
-    sys.exit(10)
-parser = argparse.ArgumentParser(description='Skript (interpret.py v jazyce Python 3.10) načte XML reprezentaci programu a tento program s využitím vstupu dle parametrů příkazové řádky interpretuje a generuje výstup.')
-parser.add_argument('--input', help='soubor se vstupy pro samotnou interpretaci zadaného zdrojového kódu')
-parser.add_argument('--source', help='vstupní soubor s XML reprezentací zdrojového kódu')
-args = parser.parse_args()
-
-if args.input:
-    input = args.input
-    if not args.source:
-        source = sys.stdin
-if args.source:
-    source = args.source
-    if not args.input:
-        input = sys.stdin
-if not args.source and not args.input:
-    sys.exit(10)
-
-program = Program(source)
-interpret = Interpret(program, input)
-interpret.process_program()
\ No newline at end of file
+            self.errors.write(f"\t\ttype: {type_names.get(elem.type)},\tvalue: {elem.value}\n")
+        self.errors.write("###############\n")
+        self.order_index += 1
+
+    #Superinstructions, each of them processes a whole sequence of instructions with the same result as the instructions would have
+    #Before every part which can fail, instr is set to the original instruction, so errors have its order
+
+    def COMPARE_JUMP(self): #<var> <symb1> <symb2> <compare> <target> <jump if>
+        result, slot = self.get_result_var()
+        args = self.instr.args
+        if args[3] == 'EQ':
+            value = self.equality(args[1], args[2])
+        else:
+            value1, value2 = self.relative()
+            value = value1 < value2 if args[3] == 'LT' else value1 > value2
+        result[slot] = TRUE_VALUE if value else FALSE_VALUE
+        if self.quick_states[self.order_index] == QUICK_NEW:
+            self.quicken('COMPARE_JUMP', args[1], args[2])
+        self.processed_instructions += 1
+        if value == args[5]:
+            self.order_index = args[4]
+            if self.processed_instructions >= self.next_check:
+                self.check_budget()
+        else:
+            self.order_index += 2
+
+    def DEFVAR_MOVE(self):  #<var> <MOVE instruction>
+        var = self.instr.args[0]
+        vars = self.define_frame(var).vars
+        if var.slot in vars if type(vars) is dict else vars[var.slot] is not None:
+            raise SemanticError(f'variable {var.name} is already defined')
+        vars[var.slot] = UNINITIALIZED
+        self.processed_instructions += 1
+        self.instr = self.instr.args[1]
+        vars[var.slot] = self.get_symb_value(self.instr.args[1])
+        self.order_index += 2
+
+    def CALL_FRAME(self):   #<target> <pairs of DEFVAR and MOVE instructions> <CALL instruction>
+        target, pairs, call = self.instr.args
+        frame = Frame(self.program.local_names)
+        self.temp_frame = frame
+        self.frames[TF] = frame
+        vars = frame.vars
+        for defvar, move in pairs:
+            self.processed_instructions += 1
+            self.instr = defvar
+            var = defvar.args[0]
+            if var.slot in vars:
+                raise SemanticError(f'variable {var.name} is already defined')
+            vars[var.slot] = UNINITIALIZED
+            self.processed_instructions += 1
+            self.instr = move
+            vars[var.slot] = self.get_symb_value(move.args[1])
+        self.local_frames.append(frame)
+        self.frames[LF] = frame
+        self.temp_frame = None
+        self.frames[TF] = None
+        self.processed_instructions += 2
+        self.instr = call
+        self.call_stack.append(self.order_index + 2 * len(pairs) + 3)
+        self.order_index = target
+        if len(self.call_stack) > self.max_call_depth:
+            self.call_depth_exceeded()
+        if self.processed_instructions >= self.next_check:
+            self.check_budget()
+
+    #Variants of instructions without checks, the analysis of the program proved that all variables are defined
+    #and initialized and all operands have the right types. Arguments are slots of the global frame
+
+    def MOVE_GF(self):  #<var> <symb>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = vars[args[1]]
+        self.order_index += 1
+
+    def ADD_GF(self):   #<var> <symb1> <symb2>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = Value(INT, vars[args[1]].value + vars[args[2]].value)
+        self.order_index += 1
+
+    def SUB_GF(self):   #<var> <symb1> <symb2>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = Value(INT, vars[args[1]].value - vars[args[2]].value)
+        self.order_index += 1
+
+    def MUL_GF(self):   #<var> <symb1> <symb2>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = Value(INT, vars[args[1]].value * vars[args[2]].value)
+        self.order_index += 1
+
+    def LT_GF(self):    #<var> <symb1> <symb2>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = TRUE_VALUE if vars[args[1]].value < vars[args[2]].value else FALSE_VALUE
+        self.order_index += 1
+
+    def GT_GF(self):    #<var> <symb1> <symb2>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = TRUE_VALUE if vars[args[1]].value > vars[args[2]].value else FALSE_VALUE
+        self.order_index += 1
+
+    def EQ_GF(self):    #<var> <symb1> <symb2>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = TRUE_VALUE if vars[args[1]].value == vars[args[2]].value else FALSE_VALUE
+        self.order_index += 1
+
+    def AND_GF(self):   #<var> <symb1> <symb2>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = TRUE_VALUE if vars[args[1]].value and vars[args[2]].value else FALSE_VALUE
+        self.order_index += 1
+
+    def OR_GF(self):    #<var> <symb1> <symb2>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = TRUE_VALUE if vars[args[1]].value or vars[args[2]].value else FALSE_VALUE
+        self.order_index += 1
+
+    def NOT_GF(self):   #<var> <symb>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = FALSE_VALUE if vars[args[1]].value else TRUE_VALUE
+        self.order_index += 1
+
+    def CONCAT_GF(self):    #<var> <symb1> <symb2>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = Value(STRING, vars[args[1]].value + vars[args[2]].value)
+        self.order_index += 1
+
+    def STRLEN_GF(self):    #<var> <symb>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        vars[args[0]] = Value(INT, len(vars[args[1]].value))
+        self.order_index += 1
+
+    def COMPARE_JUMP_GF(self):  #<var> <symb1> <symb2> <compare> <target> <jump if>
+        vars = self.global_frame.vars
+        args = self.instr.args
+        if args[3] == 'LT':
+            value = vars[args[1]].value < vars[args[2]].value
+        elif args[3] == 'GT':
+            value = vars[args[1]].value > vars[args[2]].value
+        else:
+            value = vars[args[1]].value == vars[args[2]].value
+        vars[args[0]] = TRUE_VALUE if value else FALSE_VALUE
+        self.processed_instructions += 1
+        if value == args[5]:
+            self.order_index = args[4]
+            if self.processed_instructions >= self.next_check:
+                self.check_budget()
+        else:
+            self.order_index += 2
+
+    #Quickened variants of instructions for integer and string operands, they are made and thrown away by quicken and deoptimize
+    #Missing frame or undefined variable raise AttributeError on None, uninitialized variable has no type,
+    #so whenever some check of the normal handler could fail, the instruction is deoptimized
+
+    def ADD_INT(self):  #<var> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            vars = frames[args[0]].vars
+            value1 = frames[args[2]].vars[args[3]]
+            value2 = frames[args[4]].vars[args[5]]
+            if vars[args[1]] is not None and value1.type == INT and value2.type == INT:
+                vars[args[1]] = Value(INT, value1.value + value2.value)
+                self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def SUB_INT(self):  #<var> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            vars = frames[args[0]].vars
+            value1 = frames[args[2]].vars[args[3]]
+            value2 = frames[args[4]].vars[args[5]]
+            if vars[args[1]] is not None and value1.type == INT and value2.type == INT:
+                vars[args[1]] = Value(INT, value1.value - value2.value)
+                self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def MUL_INT(self):  #<var> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            vars = frames[args[0]].vars
+            value1 = frames[args[2]].vars[args[3]]
+            value2 = frames[args[4]].vars[args[5]]
+            if vars[args[1]] is not None and value1.type == INT and value2.type == INT:
+                vars[args[1]] = Value(INT, value1.value * value2.value)
+                self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def LT_INT(self):  #<var> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            vars = frames[args[0]].vars
+            value1 = frames[args[2]].vars[args[3]]
+            value2 = frames[args[4]].vars[args[5]]
+            if vars[args[1]] is not None and value1.type == INT and value2.type == INT:
+                vars[args[1]] = TRUE_VALUE if value1.value < value2.value else FALSE_VALUE
+                self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def GT_INT(self):  #<var> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            vars = frames[args[0]].vars
+            value1 = frames[args[2]].vars[args[3]]
+            value2 = frames[args[4]].vars[args[5]]
+            if vars[args[1]] is not None and value1.type == INT and value2.type == INT:
+                vars[args[1]] = TRUE_VALUE if value1.value > value2.value else FALSE_VALUE
+                self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def EQ_INT(self):  #<var> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            vars = frames[args[0]].vars
+            value1 = frames[args[2]].vars[args[3]]
+            value2 = frames[args[4]].vars[args[5]]
+            if vars[args[1]] is not None and value1.type == INT and value2.type == INT:
+                vars[args[1]] = TRUE_VALUE if value1.value == value2.value else FALSE_VALUE
+                self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def JUMPIFEQ_INT(self):  #<label> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            value1 = frames[args[1]].vars[args[2]]
+            value2 = frames[args[3]].vars[args[4]]
+            if value1.type == INT and value2.type == INT:
+                if value1.value == value2.value:
+                    self.order_index = args[0]
+                    if self.processed_instructions >= self.next_check:
+                        self.check_budget()
+                else:
+                    self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def JUMPIFNEQ_INT(self):  #<label> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            value1 = frames[args[1]].vars[args[2]]
+            value2 = frames[args[3]].vars[args[4]]
+            if value1.type == INT and value2.type == INT:
+                if value1.value != value2.value:
+                    self.order_index = args[0]
+                    if self.processed_instructions >= self.next_check:
+                        self.check_budget()
+                else:
+                    self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def COMPARE_JUMP_INT(self):  #<var> <symb1> <symb2> <compare> <target> <jump if> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            vars = frames[args[0]].vars
+            value1 = frames[args[2]].vars[args[3]]
+            value2 = frames[args[4]].vars[args[5]]
+            if vars[args[1]] is not None and value1.type == INT and value2.type == INT:
+                if args[6] == 'LT':
+                    value = value1.value < value2.value
+                elif args[6] == 'GT':
+                    value = value1.value > value2.value
+                else:
+                    value = value1.value == value2.value
+                vars[args[1]] = TRUE_VALUE if value else FALSE_VALUE
+                self.processed_instructions += 1
+                if value == args[8]:
+                    self.order_index = args[7]
+                    if self.processed_instructions >= self.next_check:
+                        self.check_budget()
+                else:
+                    self.order_index += 2
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def LT_STR(self):  #<var> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            vars = frames[args[0]].vars
+            value1 = frames[args[2]].vars[args[3]]
+            value2 = frames[args[4]].vars[args[5]]
+            if vars[args[1]] is not None and value1.type == STRING and value2.type == STRING:
+                vars[args[1]] = TRUE_VALUE if value1.value < value2.value else FALSE_VALUE
+                self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def GT_STR(self):  #<var> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            vars = frames[args[0]].vars
+            value1 = frames[args[2]].vars[args[3]]
+            value2 = frames[args[4]].vars[args[5]]
+            if vars[args[1]] is not None and value1.type == STRING and value2.type == STRING:
+                vars[args[1]] = TRUE_VALUE if value1.value > value2.value else FALSE_VALUE
+                self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def EQ_STR(self):  #<var> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            vars = frames[args[0]].vars
+            value1 = frames[args[2]].vars[args[3]]
+            value2 = frames[args[4]].vars[args[5]]
+            if vars[args[1]] is not None and value1.type == STRING and value2.type == STRING:
+                vars[args[1]] = TRUE_VALUE if value1.value == value2.value else FALSE_VALUE
+                self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def JUMPIFEQ_STR(self):  #<label> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            value1 = frames[args[1]].vars[args[2]]
+            value2 = frames[args[3]].vars[args[4]]
+            if value1.type == STRING and value2.type == STRING:
+                if value1.value == value2.value:
+                    self.order_index = args[0]
+                    if self.processed_instructions >= self.next_check:
+                        self.check_budget()
+                else:
+                    self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def JUMPIFNEQ_STR(self):  #<label> <symb1> <symb2> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            value1 = frames[args[1]].vars[args[2]]
+            value2 = frames[args[3]].vars[args[4]]
+            if value1.type == STRING and value2.type == STRING:
+                if value1.value != value2.value:
+                    self.order_index = args[0]
+                    if self.processed_instructions >= self.next_check:
+                        self.check_budget()
+                else:
+                    self.order_index += 1
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    def COMPARE_JUMP_STR(self):  #<var> <symb1> <symb2> <compare> <target> <jump if> <instruction>
+        frames = self.frames
+        args = self.instr.args
+        try:
+            vars = frames[args[0]].vars
+            value1 = frames[args[2]].vars[args[3]]
+            value2 = frames[args[4]].vars[args[5]]
+            if vars[args[1]] is not None and value1.type == STRING and value2.type == STRING:
+                if args[6] == 'LT':
+                    value = value1.value < value2.value
+                elif args[6] == 'GT':
+                    value = value1.value > value2.value
+                else:
+                    value = value1.value == value2.value
+                vars[args[1]] = TRUE_VALUE if value else FALSE_VALUE
+                self.processed_instructions += 1
+                if value == args[8]:
+                    self.order_index = args[7]
+                    if self.processed_instructions >= self.next_check:
+                        self.check_budget()
+                else:
+                    self.order_index += 2
+                return
+        except (AttributeError, KeyError):
+            pass
+        self.deoptimize()
+
+    #Handler used instead of the normal ones of jumps when hot loops are compiled
+    #It counts backward jumps to every label and runs the compiled trace of the loop when it exists
+
+    def TRACED_JUMP(self): #<label> ...
+        index = self.order_index
+        self.jit_handlers[self.instr.opcode]()
+        target = self.order_index
+        if target > index:
+            return
+        trace = self.traces.get(target, False)
+        if trace == False:
+            count = self.loop_counts.get(target, 0) + 1
+            self.loop_counts[target] = count
+            if count < JIT_THRESHOLD:
+                return
+        #The jump is counted before the loop runs, so it is counted even if the loop ends by an error or EXIT
+        self.processed_instructions += 1
+        if trace == False:
+            trace = self.traces[target] = self.record_trace(target)
+        if trace != None and self.order_index == target:
+            start = self.processed_instructions
+            try:
+                self.order_index = trace()
+            finally:
+                if self.stats != None:
+                    self.stats.add_trace(target, self.trace_indexes[target], self.processed_instructions - start)
+        self.processed_instructions -= 1
+
+    #Handlers used instead of the normal ones when limits of sizes are set, they process the instruction by the normal handler
+    #and check the size of its result, so errors of the instruction itself are found first
+
+    def LIMITED_PUSHS(self):    #<symb>
+        self.limited_handlers[self.instr.opcode]()
+        if len(self.heap) > self.limits.data_stack:
+            self.limit_exceeded(f'limit of data stack size {self.limits.data_stack} exceeded')
+
+    def LIMITED_STRING(self):   #<var> ...
+        self.limited_handlers[self.instr.opcode]()
+        var = self.instr.args[0]
+        value = self.define_frame(var).vars[var.slot]
+        if value.type == STRING and len(value.value) > self.limits.string_size:
+            self.limit_exceeded(f'limit of string length {self.limits.string_size} exceeded')
+
+    def LIMITED_STRING_GF(self):    #<slot> ...
+        self.limited_handlers[self.instr.opcode]()
+        if len(self.global_frame.vars[self.instr.args[0]].value) > self.limits.string_size:
+            self.limit_exceeded(f'limit of string length {self.limits.string_size} exceeded')
+
+    #Handlers used instead of the normal ones when statistics are collected
+
+    #CREATEFRAME, POPFRAME and CALL_FRAME throw the temporary frame away, so variables are counted before them
+    #The local frame under the new top one is frozen by PUSHFRAME and CALL_FRAME and the frozen one is on the top again after POPFRAME
+    def STATS_FRAME(self):
+        opcode = self.instr.opcode
+        if self.temp_frame != None and opcode != PUSHFRAME_ID:
+            self.count_vars()
+        frames = self.local_frames
+        depth = len(frames)
+        self.stats_handlers[opcode]()
+        if len(frames) > depth:
+            if depth != 0:
+                count = frames[-2].count_initialized()
+                self.frozen_vars.append(count)
+                self.frozen_sum += count
+            self.stats.add_depth(len(self.heap), len(frames), len(self.call_stack))
+        elif len(frames) < depth and len(self.frozen_vars) != 0:
+            self.frozen_sum -= self.frozen_vars.pop()
+
+    def STATS_DEPTH(self):
+        self.stats_handlers[self.instr.opcode]()
+        self.stats.add_depth(len(self.heap), len(self.local_frames), len(self.call_stack))
+
+#This function writes statistics of the run stopped by exceeding a limit, other errors are ignored
+def write_limit_stats(error, stream):
+    if isinstance(error, LimitError) and error.stats != None:
+        for name, value in error.stats.items():
+            stream.write(f'\t{name}: {value:.3f}\n' if isinstance(value, float) else f'\t{name}: {value}\n')
+
+#Python code of instructions which the translation writes directly, arguments are slots of the global frame
+translated_opcodes = {
+    'MOVE_GF': 'g[{0}] = g[{1}]',
+    'ADD_GF': 'g[{0}] = Value(INT, g[{1}].value + g[{2}].value)',
+    'SUB_GF': 'g[{0}] = Value(INT, g[{1}].value - g[{2}].value)',
+    'MUL_GF': 'g[{0}] = Value(INT, g[{1}].value * g[{2}].value)',
+    'LT_GF': 'g[{0}] = TRUE_VALUE if g[{1}].value < g[{2}].value else FALSE_VALUE',
+    'GT_GF': 'g[{0}] = TRUE_VALUE if g[{1}].value > g[{2}].value else FALSE_VALUE',
+    'EQ_GF': 'g[{0}] = TRUE_VALUE if g[{1}].value == g[{2}].value else FALSE_VALUE',
+    'AND_GF': 'g[{0}] = TRUE_VALUE if g[{1}].value and g[{2}].value else FALSE_VALUE',
+    'OR_GF': 'g[{0}] = TRUE_VALUE if g[{1}].value or g[{2}].value else FALSE_VALUE',
+    'NOT_GF': 'g[{0}] = FALSE_VALUE if g[{1}].value else TRUE_VALUE',
+    'CONCAT_GF': 'g[{0}] = Value(STRING, g[{1}].value + g[{2}].value)',
+    'STRLEN_GF': 'g[{0}] = Value(INT, len(g[{1}].value))' }
+
+#Python code of instructions which translations and traces write directly, operands are Python expressions of their values
+inline_opcodes = {
+    'ADD': 'Value(INT, {0} + {1})', 'SUB': 'Value(INT, {0} - {1})', 'MUL': 'Value(INT, {0} * {1})',
+    'AND': 'TRUE_VALUE if {0} and {1} else FALSE_VALUE', 'OR': 'TRUE_VALUE if {0} or {1} else FALSE_VALUE',
+    'NOT': 'FALSE_VALUE if {0} else TRUE_VALUE', 'CONCAT': 'Value(STRING, {0} + {1})', 'STRLEN': 'Value(INT, len({0}))' }
+
+#Types of operands every directly written instruction needs
+inline_types = { 'ADD': INT, 'SUB': INT, 'MUL': INT, 'AND': BOOL, 'OR': BOOL, 'NOT': BOOL, 'CONCAT': STRING, 'STRLEN': STRING }
+
+#Python operators of comparisons
+compare_operators = { 'LT': '<', 'GT': '>', 'EQ': '==' }
+
+#This class translates the program to Python source, which is compiled by Python and run instead of the instructions
+#Every basic block of the program becomes one function which returns the index of the next block
+#Instructions the analysis proved to need no checks, jumps, moves, arithmetic, comparisons, logic and string instructions
+#are written directly as Python code with the variables of frames as Python lists and dictionaries. Directly written
+#instructions check their operands, if some check fails, the block calls the handler of the instruction, which finds the error.
+#Other instructions call their handlers from the block function, so they keep all checks and errors of the interpret
+#Jumps check the number of instructions and the time and CONCAT the length of the string, as their handlers do with limits
+class Translation:
+    def __init__(self, program):
+        self.program = program
+        self.code = None
+        self.pending = 0
+        self.used_frames = set()
+        self.checked_frames = { GF }
+    #This function returns the Python source of the translated program
+    #It defines function make_blocks(it), which makes functions of all blocks for the Interpret it
+    def get_source(self):
+        program = self.program
+        self.used_frames = { var.frame for instr in program.code for var in instr.args if type(var) is Var }
+        lines = [ f'#Translation of IPPcode23 program made by interpret {INTERPRETER_VERSION}',
+                  'def make_blocks(it):',
+                  '    g = it.global_frame.vars',
+                  '    frames = it.frames',
+                  '    ms = it.max_string_size',
+                  '    fc = it.code',
+                  '    h = it.handlers',
+                  '    blocks = {}' ]
+        for start, end in Analysis(program).blocks.items():
+            lines.append(f'    def block():')
+            lines.extend('        ' + line for line in self.translate_block(start, end))
+            lines.append(f'    blocks[{start}] = block')
+        lines.append('    return blocks')
+        return '\n'.join(lines) + '\n'
+
+    #This function returns lines of the function of one block
+    def translate_block(self, start, end):
+        code = self.program.fused_code
+        lines = self.get_frames()
+        self.pending = 0
+        index = start
+        while index < end:
+            instr = code[index]
+            name = (opcodes + fused_opcodes + special_opcodes + quick_opcodes)[instr.opcode]
+            length = get_length(instr)
+            inline = self.inline_instruction(instr, index) if instr.opcode < len(opcodes) else None
+            if name in translated_opcodes:
+                if name == 'CONCAT_GF':
+                    lines.append(f'if len(g[{instr.args[1]}].value) + len(g[{instr.args[2]}].value) > ms:')
+                    lines.extend('    ' + line for line in self.get_guard_exit(index))
+                lines.append(translated_opcodes[name].format(*instr.args))
+                self.pending += 1
+            elif name == 'LABEL':
+                self.pending += 1
+            elif name == 'JUMP':
+                lines += self.get_budget_check(instr.args[0], self.pending)
+                lines.append(f'it.processed_instructions += {self.pending + 1}')
+                lines.append(f'return {instr.args[0]}')
+                return lines
+            elif name == 'COMPARE_JUMP_GF':
+                result, slot1, slot2, compare, target, jump_if = instr.args
+                lines.append(f'value = g[{slot1}].value {compare_operators[compare]} g[{slot2}].value')
+                lines.append(f'g[{result}] = TRUE_VALUE if value else FALSE_VALUE')
+                lines.append(f'if {"value" if jump_if else "not value"}:')
+                lines.extend('    ' + line for line in self.get_budget_check(target, self.pending + 1))
+                lines.extend('    ' + line for line in self.get_exit(target, self.pending + 2))
+                self.pending += 2
+            elif name in ('JUMPIFEQ', 'JUMPIFNEQ'):
+                lines += self.check_frames(instr, index)
+                condition_lines, equal = self.get_comparison('EQ', instr.args[1], instr.args[2], index, (None, None))
+                lines += condition_lines
+                lines.append(f'if {equal}:' if name == 'JUMPIFEQ' else f'if not ({equal}):')
+                lines.extend('    ' + line for line in self.get_budget_check(instr.args[0], self.pending))
+                lines.extend('    ' + line for line in self.get_exit(instr.args[0], self.pending + 1))
+                self.pending += 1
+            elif inline != None:
+                lines += inline
+            else:
+                #The handler is taken from the code of the run when the block runs, so quickened variants are used too
+                if self.pending != 0:
+                    lines.append(f'it.processed_instructions += {self.pending}')
+                    self.pending = 0
+                lines.append(f'it.order_index = {index}')
+                lines.append(f'it.instr = fc[{index}]')
+                lines.append(f'h[it.instr.opcode]()')
+                lines.append(f'it.processed_instructions += 1')
+                lines.append(f'if it.order_index != {index + length}:')
+                lines.append(f'    return it.order_index')
+                lines += self.get_frames()
+            index += length
+        if self.pending != 0:
+            lines.append(f'it.processed_instructions += {self.pending}')
+        lines.append(f'return {end}')
+        return lines
+
+    #This function returns lines which load lists of variables of local and temporary frame, if the code uses them
+    #Missing frames are loaded as None, they are checked before the first instruction which uses them
+    def get_frames(self):
+        self.checked_frames = { GF }
+        lines = []
+        for frame, name in ((LF, 'l'), (TF, 't')):
+            if frame in self.used_frames:
+                lines.append(f'{name} = frames[{frame}].vars if frames[{frame}] is not None else None')
+        return lines
+
+    #This function returns lines which check that frames of variables of the instruction exist
+    def check_frames(self, instr, index):
+        lines = []
+        for var in instr.args:
+            if type(var) is Var and var.frame not in self.checked_frames:
+                lines.append(f'if {"glt"[var.frame]} is None:')
+                lines.extend('    ' + line for line in self.get_guard_exit(index))
+                self.checked_frames.add(var.frame)
+        return lines
+
+    #This function returns lines which leave the function, count its processed instructions and return the index of the next one
+    def get_exit(self, index, pending):
+        if pending != 0:
+            return [ f'it.processed_instructions += {pending}', f'return {index}' ]
+        return [ f'return {index}' ]
+
+    #This function returns lines which check the number of instructions and the time after the jump to the target,
+    #as jump handlers do. pending is the number of instructions before the jump which are not counted yet
+    def get_budget_check(self, target, pending):
+        return [ f'if it.processed_instructions{f" + {pending}" if pending != 0 else ""} >= it.next_check:',
+                 f'    it.order_index = {target}',
+                 f'    it.check_budget({pending})' ]
+
+    #This function returns lines used when some check of the directly written instruction fails
+    #Such checks fail only if the instruction ends with an error, so its handler is called to raise it
+    def get_guard_exit(self, index):
+        lines = [ f'it.processed_instructions += {self.pending}' ] if self.pending != 0 else []
+        return lines + [ f'it.order_index = {index}', f'it.instr = fc[{index}]', 'h[it.instr.opcode]()',
+                         'it.processed_instructions += 1', 'return it.order_index' ]
+
+    #This function returns the expression of the variable
+    def get_var(self, var):
+        return f'{"glt"[var.frame]}[{var.slot}]'
+
+    #This function returns the expression of the value of the variable, which is None if the variable is not defined
+    def get_value(self, var):
+        return self.get_var(var) if var.frame == GF else f'{"glt"[var.frame]}.get({var.slot})'
+
+    #This function returns lines which load the operand and check it, and expressions of its value and type
+    #needed_type is the type the operand must have, or None if it must be only initialized
+    def get_operand(self, symb, name, needed_type, index):
+        if type(symb) is not Var:
+            return [], repr(symb.value), str(symb.type)
+        check = f'{name}.type != {needed_type}' if needed_type != None else f'{name}.type is None'
+        lines = [ f'{name} = {self.get_value(symb)}', f'if {name} is None or {check}:' ]
+        lines.extend('    ' + line for line in self.get_guard_exit(index))
+        return lines, f'{name}.value', f'{name}.type'
+
+    #This function returns lines which load operands of the comparison and the Python expression of its result
+    #needed are types of both operands if they are known to be the same, otherwise types are checked as relative and equality do
+    def get_comparison(self, name, symb1, symb2, index, needed):
+        lines1, value1, type1 = self.get_operand(symb1, 'v0', needed[0], index)
+        lines2, value2, type2 = self.get_operand(symb2, 'v1', needed[1], index)
+        lines = lines1 + lines2
+        if needed[0] != None:
+            return lines, f'{value1} {compare_operators[name]} {value2}'
+        if name == 'EQ':
+            lines.append(f'if {type1} != {type2} and {type1} != {NIL} and {type2} != {NIL}:')
+            lines.extend('    ' + line for line in self.get_guard_exit(index))
+            return lines, f'{type1} == {type2} and {value1} == {value2}'
+        lines.append(f'if {type1} != {type2} or {type1} == {NIL}:')
+        lines.extend('    ' + line for line in self.get_guard_exit(index))
+        return lines, f'{value1} {compare_operators[name]} {value2}'
+
+    #This function returns lines which process the instruction directly, or None if it is processed by its handler
+    #needed are types of operands known from a trace, without them the types are checked as the handler checks them
+    def inline_instruction(self, instr, index, needed = None):
+        name = opcodes[instr.opcode]
+        args = instr.args
+        if name not in inline_opcodes and name not in compare_operators and name != 'MOVE':
+            return None
+        operands = args[1:3] if name not in ('NOT', 'STRLEN', 'MOVE') else args[1:2]
+        if needed == None:
+            needed = [ inline_types.get(name) ] * len(operands)
+        if name == 'MOVE' and type(operands[0]) is not Var:
+            return None
+        if any(type(symb) is not Var and needed_type != None and symb.type != needed_type for symb, needed_type in zip(operands, needed)):
+            return None
+        lines = self.check_frames(instr, index)
+        lines.append(f'if {self.get_value(args[0])} is None:')
+        lines.extend('    ' + line for line in self.get_guard_exit(index))
+        result = self.get_var(args[0])
+        if name in compare_operators:
+            operand_lines, value = self.get_comparison(name, operands[0], operands[1], index, needed)
+            lines += operand_lines
+            lines.append(f'{result} = TRUE_VALUE if {value} else FALSE_VALUE')
+        else:
+            values = []
+            for number, (symb, needed_type) in enumerate(zip(operands, needed)):
+                operand_lines, value, value_type = self.get_operand(symb, f'v{number}', needed_type, index)
+                lines += operand_lines
+                values.append(value)
+            if name == 'CONCAT':
+                lines.append(f'if len({values[0]}) + len({values[1]}) > ms:')
+                lines.extend('    ' + line for line in self.get_guard_exit(index))
+            lines.append(f'{result} = v0' if name == 'MOVE' else f'{result} = {inline_opcodes[name].format(*values)}')
+        self.pending += 1
+        return lines
+
+    def compile(self):
+        self.code = compile(self.get_source(), '<ippcode23>', 'exec')
+
+    #This function loads the compiled translation from the cache, it returns False if there is no valid one
+    #Compiled Python code can be used only by the same version of Python
+    def read_cache(self, path, digest):
+        try:
+            with open(path, 'rb') as file:
+                version, python_version, cached_digest, self.code = marshal.loads(file.read())
+            return version == INTERPRETER_VERSION and python_version == sys.version and cached_digest == digest
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+
+    def write_cache(self, path, digest):
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as file:
+                marshal.dump((INTERPRETER_VERSION, sys.version, digest, self.code), file)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    #This function runs the compiled translation and returns functions of blocks for the Interpret
+    def make_blocks(self, interpret):
+        namespace = { 'Value': Value, 'INT': INT, 'STRING': STRING, 'TRUE_VALUE': TRUE_VALUE, 'FALSE_VALUE': FALSE_VALUE }
+        exec(self.code, namespace)
+        return namespace['make_blocks'](interpret)
+
+#Number of backward jumps to the same label after which the loop is traced and compiled
+JIT_THRESHOLD = 100
+#The longest trace which is compiled, longer loops stay in the interpret
+TRACE_LIMIT = 500
+
+#This class compiles one trace of a hot loop to a Python function, the same way as Translation compiles whole programs
+#The trace is the list of instructions processed by one pass of the loop, with types of their operands and the instruction
+#which followed. The function repeats the loop while operands have the same types and conditional jumps go the same way,
+#when something differs, it stops before the instruction and returns its index, so the interpret continues from there
+#Instructions which are not written directly call their handlers and the trace stops if they do not continue as recorded
+class Trace(Translation):
+    def __init__(self, program, target, records):
+        super().__init__(program)
+        self.target = target
+        self.records = records
+
+    def get_source(self):
+        self.used_frames = { var.frame for index, types, next in self.records for var in self.program.code[index].args if type(var) is Var }
+        lines = [ f'#Trace of IPPcode23 loop at instruction {self.target} made by interpret {INTERPRETER_VERSION}',
+                  'def make_trace(it):',
+                  '    g = it.global_frame.vars',
+                  '    frames = it.frames',
+                  '    ms = it.max_string_size',
+                  '    code = it.program.code',
+                  '    h = it.base_handlers',
+                  '    def trace():' ]
+        body = self.get_frames()
+        body.append('while True:')
+        self.pending = 0
+        for index, types, next in self.records:
+            body.extend('    ' + line for line in self.trace_instruction(index, types, next))
+        body.append(f'    it.processed_instructions += {self.pending}')
+        lines.extend('        ' + line for line in body)
+        lines.append('    return trace')
+        return '\n'.join(lines) + '\n'
+
+    #When a check of the trace fails, the trace stops before the instruction, types may only differ from the recorded ones
+    def get_guard_exit(self, index):
+        return self.get_exit(index, self.pending)
+
+    #This function returns lines of one instruction of the trace
+    def trace_instruction(self, index, types, next):
+        instr = self.program.code[index]
+        name = opcodes[instr.opcode]
+        args = instr.args
+        if name == 'LABEL':
+            self.pending += 1
+            return []
+        if name == 'JUMP':
+            lines = self.get_budget_check(next, self.pending)
+            self.pending += 1
+            return lines
+        needed = None
+        if name in compare_operators or name in ('JUMPIFEQ', 'JUMPIFNEQ'):
+            needed = types[1:3] if types[1] == types[2] and types[1] != None and (name != 'LT' and name != 'GT' or types[1] != NIL) else (None, None)
+        if name in ('JUMPIFEQ', 'JUMPIFNEQ'):
+            lines = self.check_frames(instr, index)
+            condition_lines, equal = self.get_comparison('EQ', args[1], args[2], index, needed)
+            lines += condition_lines
+            jumped = next != index + 1
+            lines.append(f'if not ({equal}):' if jumped == (name == 'JUMPIFEQ') else f'if {equal}:')
+            if jumped:
+                lines.extend('    ' + line for line in self.get_exit(index + 1, self.pending + 1))
+                lines += self.get_budget_check(args[0], self.pending)
+            else:
+                lines.extend('    ' + line for line in self.get_budget_check(args[0], self.pending))
+                lines.extend('    ' + line for line in self.get_exit(args[0], self.pending + 1))
+            self.pending += 1
+            return lines
+        inline = self.inline_instruction(instr, index, needed)
+        if inline != None:
+            return inline
+        #Other instructions are processed by their handlers
+        lines = []
+        if self.pending != 0:
+            lines.append(f'it.processed_instructions += {self.pending}')
+        lines += [ f'it.order_index = {index}', f'it.instr = code[{index}]', 'h[it.instr.opcode]()', 'it.processed_instructions += 1',
+                   f'if it.order_index != {next}:', '    return it.order_index' ]
+        self.pending = 0
+        lines += self.get_frames()
+        return lines
+
+    #This function runs the compiled trace and returns its function for the Interpret
+    def make_trace(self, interpret):
+        namespace = { 'Value': Value, 'INT': INT, 'STRING': STRING, 'TRUE_VALUE': TRUE_VALUE, 'FALSE_VALUE': FALSE_VALUE }
+        exec(self.code, namespace)
+        return namespace['make_trace'](interpret)
+
+#This function finds all input files for batch mode
+#Directories are searched for files with .in extension, other paths are used as they are
+def collect_inputs(paths):
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            inputs.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.in')))
+        else:
+            inputs.append(path)
+    return inputs
+
+#This function runs the already loaded program with one input file and writes its output to output_path
+#It returns the exit code the interpret would end with
+def run_input(program, input_path, output_path, buffer_size = OUTPUT_BUFFER_SIZE, limits = NO_LIMITS):
+    try:
+        stream = open(output_path, "w")
+    except OSError:
+        return 12
+    input = None
+    try:
+        input = open_input(input_path)
+        interpret = Interpret(program, input, Output(stream, buffer_size), limits = limits)
+        return interpret.process_program()
+    except InterpretError as error:
+        sys.stderr.write(f'{input_path}: {error}\n')
+        write_limit_stats(error, sys.stderr)
+        return error.code
+    finally:
+        if input != None:
+            input.close()
+        stream.close()
+
+#Program used by batch mode. Workers of the process pool made by fork inherit it from the parent process
+batch_program = None
+
+#This function prepares a worker process of the batch mode
+#Workers which did not inherit the program load it themselves, from the cache if it is enabled
+def init_batch_worker(source, cache_dir, translate = False):
+    global batch_program
+    if batch_program == None:
+        batch_program = Program(source, cache_dir)
+        if translate:
+            batch_program.translate()
+
+#This function runs one case of batch mode, the exit code is written to the .rc file and returned
+def run_case(case):
+    input_path, base, buffer_size, limits = case
+    code = run_input(batch_program, input_path, base + '.out', buffer_size, limits)
+    try:
+        with open(base + '.rc', 'w') as file:
+            file.write(f'{code}\n')
+    except OSError:
+        return 12
+    return code
+
+#This function runs the program with every input file, the program is loaded only once
+#For input NAME.in the output is written to NAME.out and the exit code to NAME.rc, in output_dir or next to the input
+#With more jobs, the inputs are processed in parallel by a pool of processes
+#The list of inputs with their exit codes is written to standard output in the order of inputs
+def run_batch(program, paths, output_dir = None, buffer_size = OUTPUT_BUFFER_SIZE, jobs = 1, source = None, cache_dir = None,
+              limits = NO_LIMITS):
+    global batch_program
+    batch_program = program
+    cases = []
+    for input_path in collect_inputs(paths):
+        name = os.path.splitext(os.path.basename(input_path))[0]
+        base = os.path.join(output_dir if output_dir != None else os.path.dirname(input_path), name)
+        cases.append((input_path, base, buffer_size, limits))
+
+    if jobs <= 1 or len(cases) <= 1:
+        codes = map(run_case, cases)
+        for case, code in zip(cases, codes):
+            print(f'{case[0]}\t{code}')
+        return
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    with concurrent.futures.ProcessPoolExecutor(jobs, context, init_batch_worker,
+                                                (source, cache_dir, program.translation != None)) as executor:
+        chunk_size = max(1, len(cases) // (jobs * 4))
+        for case, code in zip(cases, executor.map(run_case, cases, chunksize=chunk_size)):
+            print(f'{case[0]}\t{code}')
+
+#Number of instructions run_async processes before it lets other tasks of the event loop run
+ASYNC_SLICE_SIZE = 10000
+
+#Result of one run of a program by Interpreter
+#output and errors are texts written by the program to standard output and error output, if they were captured
+#error is the InterpretError which stopped the program, or None
+RunResult = namedtuple('RunResult', ['output', 'errors', 'exit_code', 'error', 'stats'])
+
+#This function loads the program for Interpreter
+#source may be a path to XML file, XML as bytes or str, or a binary file object
+def load_program(source, cache_dir = None):
+    if isinstance(source, str) and source.lstrip().startswith('<'):
+        source = source.encode()
+    if isinstance(source, (bytes, bytearray)):
+        return Program(io.BytesIO(source))
+    return Program(source, cache_dir if isinstance(source, str) else None)
+
+#This class lets to use the interpret as a library
+#One Interpreter holds one loaded program and can run it any number of times, every run has its own frames and stacks
+class Interpreter:
+    def __init__(self, program, buffer_size = OUTPUT_BUFFER_SIZE, limits = NO_LIMITS):
+        if not isinstance(program, Program):
+            program = load_program(program)
+        self.program = program
+        self.buffer_size = buffer_size
+        self.limits = limits
+
+    #This function runs the program and returns RunResult
+    #stdin may be the input as str or bytes or a binary file object, None means empty input
+    #stdout and stderr may be text streams, output written to them is not captured in the result
+    def run(self, stdin = None, stdout = None, stderr = None):
+        output = Output(stdout if stdout != None else io.StringIO(), self.buffer_size)
+        errors = Output(stderr if stderr != None else io.StringIO(), self.buffer_size)
+        interpret = Interpret(self.program, self.make_input(stdin), output, errors, self.limits)
+
+        error = None
+        try:
+            exit_code = interpret.process_program()
+        except InterpretError as exception:
+            error = exception
+            exit_code = exception.code
+        return self.make_result(interpret, output, errors, exit_code, error, stdout, stderr)
+
+    #This function runs the program in asyncio event loop and returns RunResult
+    #The program is processed by parts of slice_size instructions and the loop can run other tasks between them,
+    #so many programs can run in one process at once and none of them blocks the others
+    #stdin may be asyncio.StreamReader, stdout and stderr may be asyncio.StreamWriter, other values work as in run
+    #If timeout in seconds is given and the program does not end in time, asyncio.TimeoutError is raised
+    async def run_async(self, stdin = None, stdout = None, stderr = None, slice_size = ASYNC_SLICE_SIZE, timeout = None):
+        if timeout != None:
+            return await asyncio.wait_for(self.run_async(stdin, stdout, stderr, slice_size), timeout)
+        input = AsyncInput(stdin) if isinstance(stdin, asyncio.StreamReader) else self.make_input(stdin)
+        output = self.make_async_output(stdout)
+        errors = self.make_async_output(stderr)
+        interpret = Interpret(self.program, input, output, errors, self.limits)
+
+        error = None
+        try:
+            while not interpret.process_instructions(slice_size):
+                await self.drain(output, errors)
+                if isinstance(input, AsyncInput) and input.pending:
+                    await input.fill_async()
+                else:
+                    await asyncio.sleep(0)
+            exit_code = interpret.exit_code
+        except InterpretError as exception:
+            error = exception
+            exit_code = exception.code
+        finally:
+            output.flush()
+            errors.flush()
+            await self.drain(output, errors)
+        return self.make_result(interpret, output, errors, exit_code, error, stdout, stderr)
+
+    #This function makes the input of the program from stdin argument of run
+    def make_input(self, stdin):
+        if stdin == None:
+            return Input(None, b'')
+        if isinstance(stdin, str):
+            return Input(None, stdin.encode())
+        if isinstance(stdin, (bytes, bytearray)):
+            return Input(None, bytes(stdin))
+        return Input(stdin)
+
+    #This function makes the output for run_async, asyncio stream writers are written without blocking the loop
+    def make_async_output(self, stream):
+        if isinstance(stream, asyncio.StreamWriter):
+            return AsyncOutput(stream, self.buffer_size)
+        return Output(stream if stream != None else io.StringIO(), self.buffer_size)
+
+    #This function writes buffered output to asyncio stream writers and waits until it is sent
+    async def drain(self, *outputs):
+        for output in outputs:
+            if isinstance(output, AsyncOutput):
+                output.flush()
+                await output.stream.drain()
+
+    #This function makes RunResult, output is captured only if the caller did not give its own stream
+    def make_result(self, interpret, output, errors, exit_code, error, stdout, stderr):
+        stats = interpret.get_stats()
+        return RunResult(output.stream.getvalue() if stdout == None else None,
+                         errors.stream.getvalue() if stderr == None else None,
+                         exit_code, error, stats)
+
+#Number of programs sent directly in run requests which the server keeps, the least recently used ones are dropped
+INLINE_PROGRAMS = 32
+
+#This class keeps compiled programs in memory and runs them on requests from clients of the server
+#Programs are identified by the hash of their XML, so loading the same XML again gives the same already compiled program
+#Loaded programs are kept until they are unloaded, programs sent in run requests are kept only in a small LRU cache
+#Clients may load source files of the server only from source_dir, without it loading of files is not allowed
+class ProgramStore:
+    def __init__(self, cache_dir = None, limits = NO_LIMITS, source_dir = None):
+        self.cache_dir = cache_dir
+        self.limits = limits
+        self.source_dir = source_dir
+        self.programs = {}
+        self.inline_programs = OrderedDict()
+        self.lock = threading.Lock()
+
+    #This function loads the program from XML text, or from a file on the server, and returns its id
+    def load(self, xml = None, source = None):
+        data = read_source(self.get_source_path(source)) if source != None else xml.encode()
+        id = hashlib.sha256(data).hexdigest()
+        with self.lock:
+            if id in self.programs:
+                return id
+            interpreter = self.inline_programs.pop(id, None)
+        if interpreter == None:
+            interpreter = Interpreter(Program(data, self.cache_dir), limits = self.limits)
+        with self.lock:
+            self.programs[id] = interpreter
+        return id
+
+    #This function compiles the program sent in a run request, or finds it if it is already in memory
+    #It returns the id and the Interpreter, so the program can be run even if other requests drop it from the cache
+    def load_inline(self, xml):
+        data = xml.encode()
+        id = hashlib.sha256(data).hexdigest()
+        with self.lock:
+            if id in self.programs:
+                return id, self.programs[id]
+            if id in self.inline_programs:
+                self.inline_programs.move_to_end(id)
+                return id, self.inline_programs[id]
+        interpreter = Interpreter(Program(io.BytesIO(data)), limits = self.limits)
+        with self.lock:
+            self.inline_programs[id] = interpreter
+            while len(self.inline_programs) > INLINE_PROGRAMS:
+                self.inline_programs.popitem(last = False)
+        return id, interpreter
+
+    #This function returns the path of the source file requested by the client, relative paths are taken from source_dir
+    #Paths which lead out of source_dir, also through symbolic links, are refused
+    def get_source_path(self, source):
+        if self.source_dir == None:
+            raise ParameterError('loading of source files is not allowed, the server has no source directory')
+        root = os.path.realpath(self.source_dir)
+        path = os.path.realpath(os.path.join(root, source))
+        if os.path.commonpath((root, path)) != root:
+            raise ParameterError(f'source {source} is not in the source directory')
+        return path
+
+    def unload(self, id):
+        with self.lock:
+            self.programs.pop(id, None)
+            self.inline_programs.pop(id, None)
+
+    def get(self, id):
+        with self.lock:
+            if id in self.programs:
+                return self.programs[id]
+            if id in self.inline_programs:
+                self.inline_programs.move_to_end(id)
+                return self.inline_programs[id]
+            raise ParameterError(f'unknown program {id}')
+
+    #This function processes one request and returns the response, both are dictionaries
+    #Requests: {"op": "load", "xml": ...} or {"op": "load", "source": path in source_dir} returns {"program": id}
+    #{"op": "run", "program": id or "xml": ..., "stdin": ...} returns {"stdout", "stderr", "exit_code", "error"}
+    #{"op": "unload", "program": id}
+    def handle(self, request):
+        op = request.get('op')
+        try:
+            if op == 'load':
+                return { 'ok': True, 'program': self.load(request.get('xml'), request.get('source')) }
+            if op == 'run':
+                id = request.get('program')
+                if id == None:
+                    id, interpreter = self.load_inline(request.get('xml'))
+                else:
+                    interpreter = self.get(id)
+                result = interpreter.run(stdin = request.get('stdin', ''))
+                return { 'ok': True, 'program': id, 'stdout': result.output, 'stderr': result.errors,
+                         'exit_code': result.exit_code, 'error': str(result.error) if result.error != None else None,
+                         'stats': result.stats }
+            if op == 'unload':
+                self.unload(request.get('program'))
+                return { 'ok': True }
+            return { 'ok': False, 'error': f'unknown operation {op}' }
+        except InterpretError as error:
+            return { 'ok': False, 'exit_code': error.code, 'error': str(error) }
+        except (OSError, AttributeError, TypeError) as error:
+            return { 'ok': False, 'error': str(error) }
+
+#This class handles one connection to the server
+#The protocol is one JSON object per line in both directions, a connection can send any number of requests
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = self.server.store.handle(request) if isinstance(request, dict) else { 'ok': False, 'error': 'request must be an object' }
+            except ValueError as error:
+                response = { 'ok': False, 'error': f'wrong request: {error}' }
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+
+class ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+#This function runs the server until it is interrupted
+#address is a path of Unix domain socket, or a port (or host:port) for TCP on localhost
+#A socket left at the path by an old server is replaced, any other file there is an error, so a wrong path never deletes a file
+def serve(address, cache_dir = None, limits = NO_LIMITS, source_dir = None):
+    host, sep, port = address.rpartition(':')
+    if port.isdigit():
+        server = ThreadingTCPServer((host if sep else 'localhost', int(port)), RequestHandler)
+    else:
+        if os.path.exists(address):
+            if not stat.S_ISSOCK(os.stat(address).st_mode):
+                raise ParameterError(f'{address} exists and is not a socket')
+            os.remove(address)
+        server = ThreadingUnixServer(address, RequestHandler)
+    server.store = ProgramStore(cache_dir, limits, source_dir)
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+#This function is the command line interface of the interpret, it returns the exit code
+def main(argv = None):
+    if argv == None:
+        argv = sys.argv[1:]
+    if '--help' in argv and len(argv) != 1:
+        return 10
+    parser = argparse.ArgumentParser(description='Skript (interpret.py v jazyce Python 3.10) načte XML reprezentaci programu a tento program s využitím vstupu dle parametrů příkazové řádky interpretuje a generuje výstup.')
+    parser.add_argument('--input', help='soubor se vstupy pro samotnou interpretaci zadaného zdrojového kódu')
+    parser.add_argument('--source', help='vstupní soubor s XML reprezentací zdrojového kódu')
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help='adresář pro ukládání přeložených programů, opakované spuštění stejného programu pak nečte znovu XML')
+    parser.add_argument('--output', help='soubor, do kterého bude zapsán výstup interpretace místo standardního výstupu')
+    parser.add_argument('--output-buffer', type=int, default=OUTPUT_BUFFER_SIZE, metavar='SIZE',
+                        help='velikost bufferu výstupu ve znacích, 0 vypíná bufferování')
+    parser.add_argument('--batch', nargs='+', metavar='INPUT',
+                        help='dávkový režim: program se načte jednou a spustí se se všemi zadanými soubory vstupů (adresáře se prohledají na soubory *.in)')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help='počet procesů, které v dávkovém režimu zpracovávají vstupy paralelně')
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help='adresář pro výstupy (*.out) a návratové kódy (*.rc) dávkového režimu, výchozí je adresář vstupu')
+    parser.add_argument('--serve', metavar='ADDRESS',
+                        help='režim serveru: cesta k Unix socketu nebo port (host:port) pro TCP, přes který se přijímají požadavky na spuštění programů')
+    parser.add_argument('--source-dir', metavar='DIR',
+                        help='adresář, ze kterého smí klienti serveru načítat soubory programů, bez něj server načítání souborů odmítá')
+    parser.add_argument('--max-instructions', type=int, metavar='N',
+                        help='maximální počet vykonaných instrukcí, kontroluje se při skocích a voláních')
+    parser.add_argument('--max-time', type=float, metavar='SECONDS',
+                        help='maximální doba běhu programu v sekundách')
+    parser.add_argument('--max-call-depth', type=int, metavar='N', help='maximální velikost zásobníku volání')
+    parser.add_argument('--max-data-stack', type=int, metavar='N', help='maximální velikost datového zásobníku')
+    parser.add_argument('--max-string-size', type=int, metavar='N', help='maximální délka řetězce vytvořeného instrukcemi CONCAT a READ')
+    parser.add_argument('--translate', action='store_true',
+                        help='program se před spuštěním přeloží do Pythonu, s --cache-dir se překlad uloží do cache')
+    parser.add_argument('--jit', action='store_true',
+                        help='často vykonávané cykly se za běhu přeloží do Pythonu, nepoužije se s --translate a --profile')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='soubor, do kterého se po skončení programu zapíše profil (počty a časy instrukcí a volání), v JSON do FILE.json')
+    parser.add_argument('--stats', action=StatsAction, metavar='FILE',
+                        help='soubor pro statistiky, do kterého se zapíší hodnoty následujících přepínačů statistik v jejich pořadí')
+    parser.add_argument('--insts', action=StatsAction, nargs=0, help='počet vykonaných instrukcí (bez LABEL, DPRINT a BREAK)')
+    parser.add_argument('--hot', action=StatsAction, nargs=0, help='order nejčastěji vykonávané instrukce')
+    parser.add_argument('--vars', action=StatsAction, nargs=0, help='maximální počet inicializovaných proměnných ve všech rámcích')
+    parser.add_argument('--stack', action=StatsAction, nargs=0, help='maximální velikost datového zásobníku')
+    parser.add_argument('--frames', action=StatsAction, nargs=0, help='maximální počet lokálních rámců')
+    parser.add_argument('--calls', action=StatsAction, nargs=0, help='maximální velikost zásobníku volání')
+    args = parser.parse_args(argv)
+    if (args.profile or args.stats) and (args.batch or args.serve):
+        return 10
+    if args.stats:
+        paths = [ path for path, names in args.stats ]
+        if None in paths:
+            return 10
+        if len(set(paths)) != len(paths):
+            return 12
+    limits = Limits(args.max_instructions, args.max_time, args.max_call_depth, args.max_data_stack, args.max_string_size)
+
+    try:
+        if args.serve:
+            serve(args.serve, args.cache_dir, limits, args.source_dir)
+            return 0
+
+        if args.batch:
+            if not args.source or args.input or args.output or args.jobs < 1:
+                raise ParameterError('--batch needs --source and can not be used with --input and --output')
+            if args.output_dir:
+                os.makedirs(args.output_dir, exist_ok=True)
+            program = Program(args.source, args.cache_dir)
+            if args.translate:
+                program.translate()
+            run_batch(program, args.batch, args.output_dir, args.output_buffer, args.jobs, args.source, args.cache_dir, limits)
+            return 0
+
+        if args.input:
+            input = open_input(args.input)
+            if not args.source:
+                source = sys.stdin.buffer
+        if args.source:
+            source = args.source
+            if not args.input:
+                input = Input(sys.stdin.buffer)
+        if not args.source and not args.input:
+            raise ParameterError('at least one of --source and --input must be given')
+
+        program = Program(source, args.cache_dir if args.source else None)
+        if args.translate:
+            program.translate()
+        if args.output:
+            try:
+                output_stream = open(args.output, "w")
+            except OSError as error:
+                raise OutputFileError(f'can not open output: {error}')
+        else:
+            output_stream = sys.stdout
+        interpret = Interpret(program, input, Output(output_stream, args.output_buffer), limits = limits)
+        if args.profile:
+            interpret.profile = Profile(program)
+        if args.stats:
+            interpret.set_stats(Stats(program))
+            if args.profile:
+                #The profiling loop counts the instructions of the program one by one, statistics use its counts
+                interpret.stats.code = program.code
+                interpret.stats.counts = interpret.profile.counts
+        if args.jit and not args.translate and not args.profile:
+            interpret.set_jit()
+        try:
+            return interpret.process_program()
+        finally:
+            #main may be called more times in one process, so files opened for the run are closed, the standard streams stay open
+            if args.output:
+                output_stream.close()
+            if args.input:
+                input.close()
+            try:
+                if args.profile:
+                    interpret.profile.write(args.profile)
+                for path, names in args.stats or ():
+                    interpret.stats.write(path, names)
+            except OSError as error:
+                raise OutputFileError(f'can not write statistics: {error}')
+    except InterpretError as error:
+        sys.stderr.write(f'{error}\n')
+        write_limit_stats(error, sys.stderr)
+        return error.code
+
+if __name__ == '__main__':
+    sys.exit(main())
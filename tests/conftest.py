@@ -0,0 +1,6 @@
+import os
+import sys
+
+#Tests import interpret.py from the root of the repository and programs.py from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,281 @@
+from xml.sax.saxutils import escape
+
+#This function makes XML representation of the program from its source in IPPcode23
+def assemble(source):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode23">']
+    order = 0
+    for line in source.splitlines():
+        parts = line.split('#')[0].split()
+        if len(parts) == 0 or parts[0] == '.IPPcode23':
+            continue
+        opcode = parts[0].upper()
+        order += 1
+        lines.append(f'  <instruction order="{order}" opcode="{opcode}">')
+        for i, arg in enumerate(parts[1:], 1):
+            if opcode in ('LABEL', 'JUMP', 'CALL', 'JUMPIFEQ', 'JUMPIFNEQ') and i == 1:
+                type, value = 'label', arg
+            elif opcode == 'READ' and i == 2:
+                type, value = 'type', arg
+            elif arg[:3] in ('GF@', 'LF@', 'TF@'):
+                type, value = 'var', arg
+            else:
+                type, value = arg.split('@', 1)
+            lines.append(f'    <arg{i} type="{type}">{escape(value)}</arg{i}>')
+        lines.append('  </instruction>')
+    lines.append('</program>')
+    return '\n'.join(lines) + '\n'
+
+LOOP = '''
+.IPPcode23
+DEFVAR GF@i
+DEFVAR GF@c
+DEFVAR GF@s
+MOVE GF@i int@0
+MOVE GF@s string@
+LABEL loop
+ADD GF@i GF@i int@1
+CONCAT GF@s GF@s string@x
+LT GF@c GF@i int@300
+JUMPIFEQ loop GF@c bool@true
+STRLEN GF@c GF@s
+WRITE GF@c
+WRITE string@\\010
+WRITE GF@i
+'''
+
+#Recursive factorial, the calls are made by CREATEFRAME, DEFVAR, MOVE, PUSHFRAME and CALL
+CALLS = '''
+.IPPcode23
+DEFVAR GF@n
+DEFVAR GF@r
+MOVE GF@n int@0
+LABEL main
+CREATEFRAME
+DEFVAR TF@x
+MOVE TF@x GF@n
+PUSHFRAME
+CALL fact
+POPFRAME
+POPS GF@r
+WRITE GF@r
+WRITE string@\\032
+ADD GF@n GF@n int@1
+JUMPIFNEQ main GF@n int@15
+EXIT int@3
+LABEL fact
+DEFVAR LF@t
+EQ LF@t LF@x int@0
+JUMPIFEQ base LF@t bool@true
+CREATEFRAME
+DEFVAR TF@x
+MOVE TF@x LF@x
+SUB TF@x TF@x int@1
+PUSHFRAME
+CALL fact
+POPFRAME
+POPS LF@t
+MUL LF@t LF@t LF@x
+PUSHS LF@t
+RETURN
+LABEL base
+PUSHS int@1
+RETURN
+'''
+
+STRINGS = '''
+.IPPcode23
+DEFVAR GF@s
+DEFVAR GF@i
+DEFVAR GF@c
+DEFVAR GF@n
+DEFVAR GF@t
+MOVE GF@s string@abc\\032řž
+MOVE GF@i int@0
+LABEL loop
+STRLEN GF@n GF@s
+GETCHAR GF@c GF@s GF@i
+STRI2INT GF@n GF@s GF@i
+INT2CHAR GF@c GF@n
+TYPE GF@t GF@c
+SETCHAR GF@s GF@i string@Z
+WRITE GF@c
+WRITE GF@t
+ADD GF@i GF@i int@1
+LT GF@t GF@i int@6
+JUMPIFEQ loop GF@t bool@true
+WRITE GF@s
+'''
+
+IO = '''
+.IPPcode23
+DEFVAR GF@a
+DEFVAR GF@t
+LABEL loop
+READ GF@a int
+TYPE GF@t GF@a
+WRITE GF@t
+WRITE string@:
+WRITE GF@a
+WRITE string@\\010
+JUMPIFNEQ loop GF@a nil@nil
+READ GF@a string
+WRITE GF@a
+READ GF@a bool
+WRITE GF@a
+'''
+
+IO_INPUT = '1\n2\nx\nhello\ntrue\n'
+
+STACK = '''
+.IPPcode23
+DEFVAR GF@i
+DEFVAR GF@v
+MOVE GF@i int@0
+LABEL push
+PUSHS GF@i
+ADD GF@i GF@i int@1
+JUMPIFNEQ push GF@i int@200
+LABEL pop
+POPS GF@v
+DPRINT GF@v
+JUMPIFNEQ pop GF@v int@0
+WRITE GF@v
+'''
+
+LOCAL_LOOP = '''
+.IPPcode23
+CREATEFRAME
+PUSHFRAME
+DEFVAR LF@i
+MOVE LF@i int@0
+DEFVAR LF@b
+MOVE LF@b bool@false
+LABEL loop
+ADD LF@i LF@i int@1
+NOT LF@b LF@b
+AND LF@b LF@b bool@true
+OR LF@b LF@b bool@false
+JUMPIFNEQ loop LF@i int@500
+WRITE LF@i
+WRITE LF@b
+POPFRAME
+WRITE TF@i
+'''
+
+#The type of GF@x changes in the middle of the loop
+TYPE_CHANGE = '''
+.IPPcode23
+DEFVAR GF@i
+DEFVAR GF@x
+DEFVAR GF@c
+MOVE GF@i int@0
+MOVE GF@x int@0
+LABEL loop
+ADD GF@i GF@i int@1
+JUMPIFNEQ same GF@i int@150
+MOVE GF@x string@s
+LABEL same
+EQ GF@c GF@x GF@x
+JUMPIFEQ next GF@x nil@nil
+LABEL next
+JUMPIFNEQ loop GF@i int@300
+WRITE GF@x
+WRITE GF@c
+'''
+
+#Division by zero after 200 passes of the loop
+ERROR_IN_LOOP = '''
+.IPPcode23
+DEFVAR GF@i
+DEFVAR GF@d
+MOVE GF@i int@0
+LABEL loop
+ADD GF@i GF@i int@1
+SUB GF@d int@200 GF@i
+IDIV GF@d int@1000 GF@d
+WRITE GF@d
+JUMP loop
+'''
+
+#The last MOVE reads an uninitialized variable right after DEFVAR
+UNINITIALIZED = '''
+.IPPcode23
+DEFVAR GF@i
+MOVE GF@i int@0
+LABEL loop
+ADD GF@i GF@i int@1
+CREATEFRAME
+DEFVAR TF@a
+MOVE TF@a GF@i
+JUMPIFNEQ loop GF@i int@150
+CREATEFRAME
+DEFVAR TF@a
+DEFVAR TF@b
+MOVE TF@b TF@a
+'''
+
+EXIT_IN_LOOP = '''
+.IPPcode23
+DEFVAR GF@i
+MOVE GF@i int@0
+LABEL loop
+ADD GF@i GF@i int@1
+WRITE GF@i
+JUMPIFNEQ loop GF@i int@250
+EXIT int@7
+'''
+
+#Name: (source, input) of the programs which end by themselves
+PROGRAMS = {
+    'loop': (LOOP, ''),
+    'calls': (CALLS, ''),
+    'strings': (STRINGS, ''),
+    'io': (IO, IO_INPUT),
+    'stack': (STACK, ''),
+    'local_loop': (LOCAL_LOOP, ''),
+    'type_change': (TYPE_CHANGE, ''),
+    'error_in_loop': (ERROR_IN_LOOP, ''),
+    'uninitialized': (UNINITIALIZED, ''),
+    'exit_in_loop': (EXIT_IN_LOOP, ''),
+}
+
+FOREVER = '''
+.IPPcode23
+DEFVAR GF@i
+MOVE GF@i int@0
+LABEL loop
+ADD GF@i GF@i int@1
+JUMP loop
+'''
+
+RECURSION = '''
+.IPPcode23
+LABEL f
+CREATEFRAME
+PUSHFRAME
+CALL f
+'''
+
+PUSHING = '''
+.IPPcode23
+LABEL loop
+PUSHS int@1
+JUMP loop
+'''
+
+DOUBLING = '''
+.IPPcode23
+DEFVAR GF@s
+MOVE GF@s string@ab
+LABEL loop
+CONCAT GF@s GF@s GF@s
+JUMP loop
+'''
+
+#Name: (source, arguments with the limit) of the programs which end only by exceeding a limit
+LIMITED = {
+    'instructions': (FOREVER, ['--max-instructions', '5000']),
+    'call_depth': (RECURSION, ['--max-call-depth', '40']),
+    'data_stack': (PUSHING, ['--max-data-stack', '100', '--max-instructions', '100000']),
+    'string_size': (DOUBLING, ['--max-string-size', '1000', '--max-instructions', '100000']),
+}
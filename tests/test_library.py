@@ -0,0 +1,71 @@
+import asyncio
+import io
+
+import pytest
+
+import interpret
+from programs import assemble, PROGRAMS, IO, IO_INPUT, CALLS, ERROR_IN_LOOP, FOREVER
+
+def test_run_returns_output_and_exit_code():
+    result = interpret.Interpreter(assemble(IO)).run(IO_INPUT)
+    assert result.output == 'int:1\nint:2\nnil:\nhellotrue'
+    assert result.errors == ''
+    assert result.exit_code == 0
+    assert result.error == None
+
+@pytest.mark.parametrize('kind', ['str', 'bytes', 'path', 'file'])
+def test_program_sources(tmp_path, kind):
+    xml = assemble(IO)
+    path = tmp_path / 'program.xml'
+    path.write_text(xml)
+    source = { 'str': xml, 'bytes': xml.encode(), 'path': str(path), 'file': io.BytesIO(xml.encode()) }[kind]
+    assert interpret.Interpreter(source).run(IO_INPUT.encode()).output == 'int:1\nint:2\nnil:\nhellotrue'
+
+def test_runs_are_independent():
+    interpreter = interpret.Interpreter(assemble(CALLS))
+    first = interpreter.run()
+    assert first.exit_code == 3
+    second = interpreter.run()
+    assert (second.output, second.exit_code) == (first.output, first.exit_code)
+
+def test_error_is_returned():
+    result = interpret.Interpreter(assemble(ERROR_IN_LOOP)).run()
+    assert result.exit_code == 57
+    assert isinstance(result.error, interpret.OperandValueError)
+    assert result.output.startswith('5555')
+
+def test_limit_is_returned():
+    result = interpret.Interpreter(assemble(FOREVER), limits = interpret.Limits(instructions = 1000)).run()
+    assert result.exit_code == 60
+    assert isinstance(result.error, interpret.LimitError)
+    assert result.stats['instructions'] >= 1000
+
+def test_streams_are_not_captured():
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    source, input = PROGRAMS['stack']
+    result = interpret.Interpreter(assemble(source)).run(input, stdout, stderr)
+    assert result.output == None and result.errors == None
+    assert stdout.getvalue() == '0'
+    assert stderr.getvalue().startswith('199198')
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_run_async_matches_run(name):
+    source, input = PROGRAMS[name]
+    interpreter = interpret.Interpreter(assemble(source))
+    expected = interpreter.run(input)
+    result = asyncio.run(interpreter.run_async(input, slice_size = 7))
+    assert (result.output, result.errors, result.exit_code, str(result.error)) == \
+           (expected.output, expected.errors, expected.exit_code, str(expected.error))
+
+def test_run_async_reads_stream():
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(IO_INPUT.encode())
+        reader.feed_eof()
+        return await interpret.Interpreter(assemble(IO)).run_async(reader, slice_size = 3)
+    assert asyncio.run(run()).output == 'int:1\nint:2\nnil:\nhellotrue'
+
+def test_run_async_timeout():
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(interpret.Interpreter(assemble(FOREVER)).run_async(timeout = 0.2))
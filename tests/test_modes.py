@@ -0,0 +1,81 @@
+import pytest
+
+import interpret
+from programs import assemble, PROGRAMS, LIMITED
+
+STATS = ['--stats', '{stats}', '--insts', '--hot', '--vars', '--stack', '--frames', '--calls']
+
+#Modes of running which must not change what the program does
+MODES = {
+    'plain': [],
+    'limits': ['--max-instructions', '10000000', '--max-call-depth', '1000', '--max-data-stack', '1000',
+               '--max-string-size', '100000', '--max-time', '600'],
+    'stats': STATS,
+    'translate': ['--translate'],
+    'translate_stats': ['--translate'] + STATS,
+    'translate_limits': ['--translate', '--max-instructions', '10000000', '--max-data-stack', '1000', '--max-string-size', '100000'],
+    'jit': ['--jit'],
+    'jit_stats': ['--jit'] + STATS,
+    'jit_limits': ['--jit', '--max-instructions', '10000000', '--max-data-stack', '1000', '--max-string-size', '100000'],
+}
+
+#Modes which collect statistics, they must give the same ones as the profiling loop, which processes instructions one by one
+STATS_MODES = ('stats', 'translate_stats', 'jit_stats')
+
+#Modes which must stop the programs of LIMITED at the same place as the plain run
+LIMITED_MODES = {
+    'stats': STATS,
+    'translate': ['--translate'],
+    'translate_stats': ['--translate'] + STATS,
+    'jit': ['--jit'],
+    'jit_stats': ['--jit'] + STATS,
+}
+
+@pytest.fixture(autouse = True)
+def jit_threshold(monkeypatch):
+    #Loops of the test programs are short, so they are traced after few passes
+    monkeypatch.setattr(interpret, 'JIT_THRESHOLD', 3)
+
+#This function runs the program by main of the interpret and returns its stdout, stderr, exit code and statistics
+def run(tmp_path, capsys, source, input, args):
+    program = tmp_path / 'program.xml'
+    program.write_text(assemble(source))
+    input_path = tmp_path / 'input.txt'
+    input_path.write_text(input)
+    stats = tmp_path / 'stats.txt'
+    if stats.exists():
+        stats.unlink()
+    argv = ['--source', str(program), '--input', str(input_path)] + [ arg.format(stats = stats) for arg in args ]
+    capsys.readouterr()
+    exit_code = interpret.main(argv)
+    captured = capsys.readouterr()
+    return captured.out, captured.err, exit_code, stats.read_text() if stats.exists() else None
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_modes_do_not_change_results(tmp_path, capsys, name):
+    source, input = PROGRAMS[name]
+    expected = run(tmp_path, capsys, source, input, [])[:3]
+    for mode, args in MODES.items():
+        assert run(tmp_path, capsys, source, input, args)[:3] == expected, mode
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_stats_are_same_in_all_modes(tmp_path, capsys, name):
+    source, input = PROGRAMS[name]
+    expected = run(tmp_path, capsys, source, input, STATS + ['--profile', str(tmp_path / 'profile')])
+    assert expected[3] != None
+    for mode in STATS_MODES:
+        assert run(tmp_path, capsys, source, input, MODES[mode]) == expected, mode
+
+#Lines with time differ between runs
+def without_time(errors):
+    return [ line for line in errors.splitlines() if not line.startswith('\ttime') ]
+
+@pytest.mark.parametrize('name', LIMITED)
+def test_limits_stop_program_in_all_modes(tmp_path, capsys, name):
+    source, limit = LIMITED[name]
+    out, err, exit_code, stats = run(tmp_path, capsys, source, '', limit)
+    assert exit_code == 60
+    assert 'limit' in err
+    for mode, args in LIMITED_MODES.items():
+        result = run(tmp_path, capsys, source, '', limit + args)
+        assert (result[0], result[2], without_time(result[1])) == (out, 60, without_time(err)), mode
@@ -0,0 +1,85 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import interpret
+from programs import assemble, IO, IO_INPUT, ERROR_IN_LOOP
+
+OUTPUT = 'int:1\nint:2\nnil:\nhellotrue'
+
+def test_load_run_unload():
+    store = interpret.ProgramStore()
+    response = store.handle({ 'op': 'load', 'xml': assemble(IO) })
+    assert response['ok']
+    id = response['program']
+    response = store.handle({ 'op': 'run', 'program': id, 'stdin': IO_INPUT })
+    assert (response['ok'], response['stdout'], response['exit_code'], response['error']) == (True, OUTPUT, 0, None)
+    assert store.handle({ 'op': 'load', 'xml': assemble(IO) })['program'] == id
+    assert store.handle({ 'op': 'unload', 'program': id }) == { 'ok': True }
+    assert not store.handle({ 'op': 'run', 'program': id })['ok']
+
+def test_run_inline_program():
+    store = interpret.ProgramStore()
+    response = store.handle({ 'op': 'run', 'xml': assemble(ERROR_IN_LOOP) })
+    assert response['ok'] and response['exit_code'] == 57 and response['error'] != None
+    assert store.handle({ 'op': 'run', 'xml': assemble(ERROR_IN_LOOP) })['program'] == response['program']
+
+@pytest.mark.parametrize('cache', [False, True])
+def test_load_source(tmp_path, cache):
+    source_dir = tmp_path / 'src'
+    source_dir.mkdir()
+    (source_dir / 'io.xml').write_text(assemble(IO))
+    cache_dir = tmp_path / 'cache' if cache else None
+    store = interpret.ProgramStore(str(cache_dir) if cache else None, source_dir = str(source_dir))
+    response = store.handle({ 'op': 'load', 'source': 'io.xml' })
+    assert response['ok'], response
+    assert store.handle({ 'op': 'run', 'program': response['program'], 'stdin': IO_INPUT })['stdout'] == OUTPUT
+    if cache:
+        assert len(os.listdir(cache_dir)) != 0
+
+def test_load_source_is_restricted(tmp_path):
+    source_dir = tmp_path / 'src'
+    source_dir.mkdir()
+    (tmp_path / 'outside.xml').write_text(assemble(IO))
+    (source_dir / 'io.xml').write_text(assemble(IO))
+    assert not interpret.ProgramStore().handle({ 'op': 'load', 'source': str(source_dir / 'io.xml') })['ok']
+    store = interpret.ProgramStore(source_dir = str(source_dir))
+    assert not store.handle({ 'op': 'load', 'source': '../outside.xml' })['ok']
+    assert not store.handle({ 'op': 'load', 'source': str(tmp_path / 'outside.xml') })['ok']
+
+def test_socket_round_trip(tmp_path):
+    source_dir = tmp_path / 'src'
+    source_dir.mkdir()
+    (source_dir / 'io.xml').write_text(assemble(IO))
+    address = str(tmp_path / 'socket')
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'interpret.py')
+    server = subprocess.Popen([sys.executable, script, '--serve', address, '--source-dir', str(source_dir)])
+    try:
+        for _ in range(100):
+            if os.path.exists(address):
+                break
+            time.sleep(0.05)
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(address)
+            stream = client.makefile('rwb')
+            requests = [{ 'op': 'load', 'source': 'io.xml' }, { 'op': 'run', 'xml': assemble(IO), 'stdin': IO_INPUT }, 'wrong']
+            for request in requests:
+                stream.write(json.dumps(request).encode() + b'\n')
+            stream.flush()
+            loaded, ran, wrong = [ json.loads(stream.readline()) for _ in requests ]
+        assert loaded['ok'] and ran['ok'] and not wrong['ok']
+        assert ran['program'] == loaded['program'] and ran['stdout'] == OUTPUT
+    finally:
+        server.terminate()
+        server.wait()
+
+def test_serve_keeps_other_files(tmp_path):
+    path = tmp_path / 'file.txt'
+    path.write_text('data')
+    assert interpret.main(['--serve', str(path)]) == 10
+    assert path.read_text() == 'data'